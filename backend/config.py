@@ -24,6 +24,15 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./insurance.db"
+    DATABASE_PROFILE: str = "production"  # "production" (pooled; WAL and tuned pragmas on SQLite) or "default" (driver defaults)
+    DATABASE_ECHO: bool = False  # Log every SQL statement (slow; for debugging only)
+    DATABASE_POOL_SIZE: int = 10  # Connections kept open
+    DATABASE_MAX_OVERFLOW: int = 10  # Extra connections opened under burst load
+    DATABASE_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection
+    DATABASE_POOL_RECYCLE: int = 1800  # Seconds before a server connection is replaced
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Wait this long for the write lock before "database is locked"
+    SQLITE_CACHE_SIZE_MB: int = 64  # Page cache per connection
+    SQLITE_MMAP_SIZE_MB: int = 256  # Memory-mapped reads
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production-use-openssl-rand-hex-32"
@@ -32,12 +41,69 @@ class Settings(BaseSettings):
     
     # AI Model
     MODEL_PATH: str = "../cars_claim_model.keras"
+    MODEL_BACKEND: str = "keras"  # "keras" or "tflite"
+    TFLITE_MODEL_PATH: str = "../cars_claim_model.tflite"
+    TFLITE_NUM_THREADS: int = 4  # XNNPACK CPU threads per interpreter
+    MODEL_QUANTIZATION: str = "none"  # "none", "float16", "dynamic" or "int8" (served via TFLite)
+    USE_MODEL_SERVER: bool = False  # Send inference to a shared `python -m models.model_server`
+    MODEL_SERVER_SOCKET: str = "/tmp/claimguard-model.sock"
     UPLOAD_DIR: str = "./uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # Uploads are streamed to disk in 1MB chunks
+    STORAGE_BACKEND: str = "local"  # Content-addressed upload storage ("local" filesystem)
+    STORAGE_FANOUT_DEPTH: int = 2  # Directory levels of 2 hex characters (256 entries) each
+    BLOB_GC_GRACE_SECONDS: int = 3600  # Unreferenced uploads are kept this long before collection
+    
+    COMPILED_INFERENCE: bool = True  # Serve through a traced tf.function instead of model.predict
+    WARMUP_BATCH_SIZES: list = [1, 8, 32]  # Batch sizes run once at startup
+    MODEL_LOADING_RETRY_AFTER: int = 5  # Retry-After seconds sent while the model loads
+    
+    # Inference batching
+    BATCH_MAX_SIZE: int = 32  # Max images per forward pass (1 disables batching)
+    BATCH_MAX_WAIT_MS: float = 5.0  # Max time to wait for a batch to fill
+    
+    # Inference executor
+    INFERENCE_EXECUTOR: str = "thread"  # "thread" or "process"
+    INFERENCE_WORKERS: int = 2  # Concurrent inference jobs
+    INFERENCE_MAX_PENDING: int = 256  # Images queued beyond this are rejected with 503
+    PREPROCESS_WORKERS: int = 4  # Threads decoding images within a batch
+    MAX_BATCH_IMAGES: int = 32  # Max images per /api/analyze/batch request
+    
+    # Prediction cache
+    PREDICTION_CACHE_SIZE: int = 4096  # In-memory LRU entries (0 disables)
+    PREDICTION_CACHE_PERSISTENT: bool = False  # Also keep predictions in the database
+    
+    # Claim analysis jobs
+    ANALYSIS_WORKERS: int = 2  # Claims analyzed concurrently in the background
+    ANALYSIS_MAX_ATTEMPTS: int = 3  # Attempts before a claim's analysis is marked failed
+    ANALYSIS_RETRY_BACKOFF: float = 2.0  # Seconds before the first retry, doubled on each attempt
+    ANALYSIS_LEASE_SECONDS: float = 300.0  # An analyzing job untouched this long is taken over by another worker
+    ANALYSIS_EVENTS_KEEPALIVE: float = 15.0  # Seconds between keepalives on analysis event streams
     
     # Image Processing
     IMAGE_SIZE: tuple = (224, 224)  # Standard size for most CNN models
     ALLOWED_EXTENSIONS: set = {"png", "jpg", "jpeg", "webp"}
+    MAX_IMAGE_PIXELS: int = 50_000_000  # Images over this many pixels are rejected from the header
+    MAX_IMAGE_FRAMES: int = 1  # Animated images with more frames are rejected
+    IMAGE_HEADER_MAX_BYTES: int = 1048576  # Upload bytes searched for the image header; a header beyond them is rejected
+    FAST_PREPROCESS: bool = False  # Reduced-resolution JPEG decode and in-place normalization (check with tools.preprocess_parity first)
+    
+    # Decode admission control
+    DECODE_MEMORY_BUDGET_MB: int = 1024  # Estimated memory of image decodes allowed at once
+    DECODE_MAX_WAITING: int = 64  # Requests waiting for budget beyond this get a 503
+    DECODE_WAIT_TIMEOUT: float = 30.0  # Seconds a request may wait for budget before a 503
+    
+    # Bulk export and import
+    EXPORT_BATCH_SIZE: int = 1000  # Rows fetched from the cursor and written per chunk
+    IMPORT_BATCH_SIZE: int = 500  # Rows inserted per transaction
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000  # Failed rows listed in the import response (all are counted)
+    IMPORT_MAX_RECORD_SIZE: int = 1048576  # Longest import line or CSV record in bytes; longer ones are rejected unbuffered
+    
+    # Image derivatives
+    DERIVATIVE_DIR: str = "./derivatives"
+    DERIVATIVE_SIZES: dict = {"thumb": 256, "medium": 1024}  # Longest side in pixels per WebP rendition
+    DERIVATIVE_QUALITY: int = 80  # WebP quality
+    DERIVATIVE_WORKERS: int = 2  # Background rendering threads
     
     class Config:
         env_file = ".env"
@@ -48,3 +114,4 @@ settings = Settings()
 
 # Create upload directory if it doesn't exist
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+os.makedirs(settings.DERIVATIVE_DIR, exist_ok=True)
@@ -1,39 +1,48 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import os
 
 from config import settings
+from models import database
 from models.database import init_db
-from models.ml_model import FraudDetectionModel
+from utils.model_loader import model_loader
+from utils.analysis_queue import analysis_queue
+from utils.image_derivatives import DerivativeStaticFiles, derivative_generator
+from utils.decode_admission import decode_admission
+from utils.claim_stats import ensure_claim_stats
 from routes import claims, ai_analysis, auth
 
 
-# Global ML model instance
-ml_model = None
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
-    global ml_model
-    
     # Startup
     print("🚀 Starting up Insurance Fraud Detection API...")
     
     # Initialize database
     await init_db()
+    async with database.async_session_maker() as session:
+        await ensure_claim_stats(session)
     print("✅ Database initialized")
     
-    # Load ML model
-    ml_model = FraudDetectionModel(settings.MODEL_PATH)
-    print("✅ AI Model loaded successfully")
+    # Load ML model in the background so the server can start serving now
+    await model_loader.start()
+    print("⏳ AI Model loading in the background")
+    
+    # Start background claim analysis (resumes jobs left from the last run)
+    await analysis_queue.start()
+    print(f"✅ Claim analysis queue started ({analysis_queue.workers} workers)")
     
     yield
     
     # Shutdown
     print("👋 Shutting down...")
+    await analysis_queue.stop()
+    derivative_generator.shutdown()
+    await model_loader.stop()
 
 
 # Create FastAPI app
@@ -42,6 +51,7 @@ app = FastAPI(
     version=settings.APP_VERSION,
     description="AI-powered insurance claim fraud detection system",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
 )
@@ -53,6 +63,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -64,6 +75,10 @@ app.include_router(ai_analysis.router, prefix="/api/analyze", tags=["AI Analysis
 if os.path.exists(settings.UPLOAD_DIR):
     app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
+# Thumbnails and medium WebP renditions, cached as immutable
+if os.path.exists(settings.DERIVATIVE_DIR):
+    app.mount("/derivatives", DerivativeStaticFiles(directory=settings.DERIVATIVE_DIR), name="derivatives")
+
 
 @app.get("/")
 async def root():
@@ -78,13 +93,18 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    batch_scheduler = model_loader.batch_scheduler
+    inference_executor = model_loader.inference_executor
+    prediction_cache = model_loader.prediction_cache
     return {
         "status": "healthy",
-        "model_loaded": ml_model is not None,
-        "database": "connected"
+        "model_loaded": model_loader.ready,
+        "model": model_loader.status(),
+        "database": "connected",
+        "batching": batch_scheduler.stats() if batch_scheduler else None,
+        "inference": inference_executor.stats() if inference_executor else None,
+        "prediction_cache": prediction_cache.stats() if prediction_cache else None,
+        "analysis_queue": analysis_queue.stats(),
+        "derivatives": derivative_generator.stats(),
+        "decode_admission": decode_admission.stats(),
     }
-
-
-# Make ml_model accessible to routes
-def get_ml_model():
-    return ml_model
@@ -0,0 +1,130 @@
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+from config import settings
+
+
+class KerasBackend:
+    """Full TensorFlow/Keras runtime serving the .keras model"""
+
+    name = "keras"
+
+    def __init__(self, model_path: str, compiled: bool = True):
+        from tensorflow import keras
+
+        self.model = keras.models.load_model(model_path)
+        self.input_shape = self.model.input_shape
+        self.output_shape = self.model.output_shape
+        self._infer = None
+        if compiled:
+            self.compile()
+
+    def compile(self):
+        """Wrap the model in a tf.function with a fixed input signature"""
+        import tensorflow as tf
+
+        width, height = settings.IMAGE_SIZE
+        model = self.model
+
+        # Batch dimension is left open so one trace serves every batch size
+        @tf.function(
+            input_signature=[tf.TensorSpec(shape=(None, height, width, 3), dtype=tf.float32)],
+            reduce_retracing=True,
+        )
+        def infer(inputs):
+            return model(inputs, training=False)
+
+        self._infer = infer
+
+    def forward(self, inputs: np.ndarray) -> np.ndarray:
+        """Run the model on a preprocessed (N, H, W, 3) batch"""
+        if self._infer is not None:
+            return self._infer(inputs).numpy()
+        return self.model.predict(inputs, batch_size=len(inputs), verbose=0)
+
+
+class TFLiteBackend:
+    """
+    TensorFlow Lite runtime serving a converted .tflite model
+
+    Uses the standalone tflite_runtime package when installed so the full
+    TensorFlow stack is never imported. Float kernels run on XNNPACK with
+    `num_threads` CPU threads.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(
+            model_path=model_path,
+            num_threads=num_threads or settings.TFLITE_NUM_THREADS,
+        )
+        self.interpreter.allocate_tensors()
+
+        input_details = self.interpreter.get_input_details()[0]
+        output_details = self.interpreter.get_output_details()[0]
+        self._input_index = input_details["index"]
+        self._output_index = output_details["index"]
+        self._batch_size = int(input_details["shape"][0])
+        self.input_shape = (None, *input_details["shape"][1:].tolist())
+        self.output_shape = (None, *output_details["shape"][1:].tolist())
+
+        # The interpreter is not thread-safe; it parallelizes internally instead
+        self._lock = threading.Lock()
+
+    def forward(self, inputs: np.ndarray) -> np.ndarray:
+        """Run the model on a preprocessed (N, H, W, 3) batch"""
+        with self._lock:
+            if len(inputs) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input_index, list(inputs.shape))
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(inputs)
+            self.interpreter.set_tensor(self._input_index, inputs)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output_index).copy()
+
+
+def default_backend() -> str:
+    """Backend selected by settings; quantized artifacts are always served by TFLite"""
+    if settings.MODEL_QUANTIZATION != "none":
+        return "tflite"
+    return settings.MODEL_BACKEND
+
+
+def quantized_model_path(quantization: str) -> str:
+    """Where the quantized variant of the TFLite model lives"""
+    root, _ = os.path.splitext(settings.TFLITE_MODEL_PATH)
+    return f"{root}.{quantization}.tflite"
+
+
+def default_model_path(backend: Optional[str] = None) -> str:
+    """Model artifact served by a backend"""
+    backend = backend or default_backend()
+    if backend == "remote":
+        return settings.MODEL_SERVER_SOCKET
+    if backend == "tflite":
+        if settings.MODEL_QUANTIZATION != "none":
+            return quantized_model_path(settings.MODEL_QUANTIZATION)
+        return settings.TFLITE_MODEL_PATH
+    return settings.MODEL_PATH
+
+
+def load_backend(backend: str, model_path: str, compiled: bool = True):
+    """Load a model artifact into the named inference backend"""
+    if backend == "keras":
+        return KerasBackend(model_path, compiled=compiled)
+    if backend == "tflite":
+        return TFLiteBackend(model_path)
+    if backend == "remote":
+        from models.model_server import RemoteBackend
+        return RemoteBackend(model_path)
+    raise ValueError(f"Unknown model backend: {backend}")
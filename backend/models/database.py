@@ -1,10 +1,17 @@
-from sqlalchemy import create_engine, Column, String, Integer, Float, Boolean, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import create_engine, Column, String, Integer, Float, Boolean, Text, DateTime, ForeignKey, Enum, Index, JSON, event, inspect, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from datetime import datetime
 import enum
 
+import orjson
+from fastapi import Depends
+
 from config import settings
 
 Base = declarative_base()
@@ -23,6 +30,13 @@ class ClaimStatus(str, enum.Enum):
     INFO_REQUESTED = "info_requested"
 
 
+class AnalysisStatus(str, enum.Enum):
+    PENDING_ANALYSIS = "pending_analysis"
+    ANALYZING = "analyzing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class FraudRisk(str, enum.Enum):
     LOW = "low"
     MEDIUM = "medium"
@@ -72,11 +86,12 @@ class Claim(Base):
     incident_date = Column(String, nullable=False)
     location = Column(String, nullable=False)
     description = Column(Text, nullable=False)
-    images = Column(Text, nullable=True)  # JSON string of image URLs
+    images = Column(JSON(none_as_null=True), nullable=True)  # List of image storage keys
     
     # Status and analysis
     status = Column(Enum(ClaimStatus), default=ClaimStatus.PENDING, index=True)
     damage_type = Column(Enum(DamageType), nullable=True)
+    analysis_status = Column(Enum(AnalysisStatus), nullable=True)  # None when no images were uploaded
     
     # Policy information
     policy_number = Column(String, nullable=False)
@@ -90,6 +105,11 @@ class Claim(Base):
     claimant = relationship("User", back_populates="claims")
     ai_analysis = relationship("AIAnalysisResult", back_populates="claim", uselist=False)
     comments = relationship("Comment", back_populates="claim")
+    
+    __table_args__ = (
+        # Serves the claim listing: one claimant's claims, newest first, keyset-paginated
+        Index("ix_claims_claimant_created_id", "claimant_id", "created_at", "id"),
+    )
 
 
 class AIAnalysisResult(Base):
@@ -114,7 +134,7 @@ class AIAnalysisResult(Base):
     estimated_cost = Column(Float, default=0.0)
     
     # Raw data
-    raw_prediction = Column(Text, nullable=True)  # JSON string
+    raw_prediction = Column(JSON(none_as_null=True), nullable=True)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -137,10 +157,181 @@ class Comment(Base):
     claim = relationship("Claim", back_populates="comments")
 
 
+class PredictionCacheEntry(Base):
+    """Persistent tier of the prediction cache, keyed by image digest and model version"""
+    __tablename__ = "prediction_cache"
+    
+    image_digest = Column(String, primary_key=True)
+    model_version = Column(String, primary_key=True)
+    result = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AnalysisJob(Base):
+    """Background AI analysis of a claim's images, persisted so it survives restarts"""
+    __tablename__ = "analysis_jobs"
+    
+    claim_id = Column(String, ForeignKey("claims.id"), primary_key=True)
+    status = Column(Enum(AnalysisStatus), default=AnalysisStatus.PENDING_ANALYSIS, index=True)
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class StoredBlob(Base):
+    """Reference count of a content-addressed upload, shared by identical images"""
+    __tablename__ = "blobs"
+    
+    key = Column(String, primary_key=True)
+    size = Column(Integer, nullable=True)
+    refcount = Column(Integer, default=0, nullable=False, index=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ClaimStatsSummary(Base):
+    """Running claim aggregates per claimant: a "total" row plus one row per filing day"""
+    __tablename__ = "claim_stats"
+    
+    claimant_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    period = Column(String, primary_key=True)  # "total" or the filing date (YYYY-MM-DD)
+    
+    # Counters, adjusted as claims and AI analysis results are written
+    claims = Column(Integer, default=0, nullable=False)
+    status_pending = Column(Integer, default=0, nullable=False)
+    status_approved = Column(Integer, default=0, nullable=False)
+    status_rejected = Column(Integer, default=0, nullable=False)
+    status_info_requested = Column(Integer, default=0, nullable=False)
+    fraud_low = Column(Integer, default=0, nullable=False)
+    fraud_medium = Column(Integer, default=0, nullable=False)
+    fraud_high = Column(Integer, default=0, nullable=False)
+    estimated_cost = Column(Float, default=0.0, nullable=False)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def dialect_insert(db):
+    """INSERT construct with ON CONFLICT support for the session's database"""
+    return postgresql_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+
+
+def _add_missing_columns(conn):
+    """Add columns introduced after a table was first created"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+def _convert_json_columns(conn):
+    """
+    Convert JSON columns created as TEXT (before they were JSON) on PostgreSQL
+
+    PostgreSQL drivers decode JSON themselves, so SQLAlchemy's JSON type
+    reads a TEXT column back as a raw string. SQLite stores JSON as text
+    either way and needs no change.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if isinstance(column.type, JSON) and isinstance(existing.get(column.name), String):
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ALTER COLUMN {column.name} TYPE {column_type} "
+                    f"USING NULLIF({column.name}, '')::{column_type}"
+                ))
+                print(f"✅ Converted {table.name}.{column.name} from text to {column_type}")
+
+
+def _add_missing_indexes(conn):
+    """Create indexes introduced after a table was first created"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+
+
 # Database session management
 engine = None
 async_session_maker = None
 
+# Engine profiles selectable with DATABASE_PROFILE
+DATABASE_PROFILES = ("production", "default")
+
+
+def _json_dumps(value) -> str:
+    return orjson.dumps(value).decode()
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(database_url: str, profile: str) -> dict:
+    """
+    create_async_engine arguments for an engine profile
+    
+    "default" leaves pooling to the driver (aiosqlite opens a connection,
+    and a thread, per session). "production" keeps a sized pool of
+    connections open; SQLite connections also get WAL and tuned pragmas
+    when they connect (see `_set_sqlite_pragmas`).
+    """
+    if profile not in DATABASE_PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE '{profile}'. Choose one of: {', '.join(DATABASE_PROFILES)}")
+    
+    options = {
+        "echo": settings.DATABASE_ECHO,
+        "future": True,
+        # JSON columns are encoded and decoded with orjson
+        "json_serializer": _json_dumps,
+        "json_deserializer": orjson.loads,
+    }
+    url = make_url(database_url)
+    if profile == "default" or _is_memory_sqlite(url):
+        return options
+    
+    options.update(
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+    )
+    if url.get_backend_name() == "sqlite":
+        options["poolclass"] = AsyncAdaptedQueuePool
+    else:
+        options.update(pool_recycle=settings.DATABASE_POOL_RECYCLE, pool_pre_ping=True)
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning for the production profile"""
+    cursor = dbapi_connection.cursor()
+    # Readers no longer block writers, or vice versa; NORMAL sync is durable enough under WAL
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    # Wait for the write lock instead of failing with "database is locked"
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_MB * 1024}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
 
 async def init_db():
     """Initialize database and create tables"""
@@ -148,12 +339,17 @@ async def init_db():
     
     engine = create_async_engine(
         settings.DATABASE_URL,
-        echo=settings.DEBUG,
-        future=True,
+        **engine_options(settings.DATABASE_URL, settings.DATABASE_PROFILE),
     )
+    url = make_url(settings.DATABASE_URL)
+    if settings.DATABASE_PROFILE == "production" and url.get_backend_name() == "sqlite" and not _is_memory_sqlite(url):
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_convert_json_columns)
+        await conn.run_sync(_add_missing_indexes)
     
     async_session_maker = async_sessionmaker(
         engine,
@@ -161,17 +357,30 @@ async def init_db():
         expire_on_commit=False,
     )
     
-    print("✅ Database tables created successfully")
+    print(f"✅ Database tables created successfully ({settings.DATABASE_PROFILE} profile)")
 
 
-async def get_db():
-    """Dependency to get database session"""
+async def get_session():
+    """
+    Request-scoped session shared by every dependency of a request
+    
+    FastAPI caches dependencies per request, so the current user lookup and
+    the route use one session and hold one pooled connection between them.
+    """
     async with async_session_maker() as session:
-        try:
-            yield session
-            await session.commit()
-        except Exception:
-            await session.rollback()
-            raise
-        finally:
-            await session.close()
+        yield session
+
+
+async def get_db(session: AsyncSession = Depends(get_session)):
+    """Dependency to get database session"""
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+
+
+async def get_read_db(session: AsyncSession = Depends(get_session)):
+    """Dependency to get a session for read-only requests; it is never committed"""
+    yield session
@@ -0,0 +1,257 @@
+"""
+Shared model-serving process for multi-worker deployments
+
+One server process owns the model; API workers decode and preprocess
+images locally, straight into shared memory, and send only the segment
+name over a Unix socket. The server maps the segment without copying the
+pixels, batches concurrent requests from all workers into one forward
+pass and returns the raw outputs.
+
+Run alongside uvicorn and set USE_MODEL_SERVER=True for the API workers:
+    python -m models.model_server
+"""
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+
+# Wire format: 4-byte big-endian header length, JSON header, optional raw payload
+_LENGTH = struct.Struct(">I")
+
+
+def _send(sock: socket.socket, header: Dict[str, Any], payload: bytes = b""):
+    data = json.dumps(header).encode()
+    sock.sendall(_LENGTH.pack(len(data)) + data + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    while view:
+        received = sock.recv_into(view)
+        if not received:
+            raise ConnectionError("Model server closed the connection")
+        view = view[received:]
+    return bytes(buffer)
+
+
+def _recv(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    (length,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    header = json.loads(_recv_exact(sock, length))
+    payload = _recv_exact(sock, header.get("payload_bytes", 0))
+    return header, payload
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Map an existing segment without letting this process's tracker unlink it"""
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class RemoteBackend:
+    """
+    Client side of the model server, used as a FraudDetectionModel backend
+
+    Each thread owns a shared memory segment that input batches are
+    allocated in, so preprocessing writes pixels where the server reads
+    them. Each thread also keeps its own connection.
+    """
+
+    name = "remote"
+
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or settings.MODEL_SERVER_SOCKET
+        self._local = threading.local()
+
+        info = self._request({"op": "info"})[0]
+        self.model_version = info["model_version"]
+        self.input_shape = tuple(info["input_shape"])
+        self.output_shape = tuple(info["output_shape"])
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _request(self, header: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        sock = self._connection()
+        try:
+            _send(sock, header)
+            response, payload = _recv(sock)
+        except (OSError, ConnectionError):
+            sock.close()
+            self._local.sock = None
+            raise
+        if "error" in response:
+            raise RuntimeError(f"Model server error: {response['error']}")
+        return response, payload
+
+    def _segment(self, nbytes: int) -> shared_memory.SharedMemory:
+        """This thread's shared memory segment, grown if too small"""
+        shm = getattr(self._local, "shm", None)
+        if shm is None or shm.size < nbytes:
+            if shm is not None:
+                # Views of the old segment may still be alive, so keep it
+                # mapped; unlinking frees it once they are gone
+                shm.unlink()
+                self._local.retired.append(shm)
+            else:
+                self._local.retired = []
+            width, height = settings.IMAGE_SIZE
+            capacity = settings.BATCH_MAX_SIZE * height * width * 3 * 4
+            shm = shared_memory.SharedMemory(create=True, size=max(nbytes, capacity))
+            self._local.shm = shm
+            self._local.address = np.ndarray((1,), dtype=np.uint8, buffer=shm.buf).ctypes.data
+        return shm
+
+    def allocate(self, batch_size: int) -> np.ndarray:
+        """Input array backed by this thread's shared memory segment"""
+        width, height = settings.IMAGE_SIZE
+        shape = (batch_size, height, width, 3)
+        shm = self._segment(batch_size * height * width * 3 * 4)
+        return np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+
+    def forward(self, inputs: np.ndarray) -> np.ndarray:
+        """Run a preprocessed batch on the server"""
+        shm = getattr(self._local, "shm", None)
+        in_segment = (
+            shm is not None
+            and inputs.flags.c_contiguous
+            and inputs.ctypes.data == self._local.address
+        )
+
+        if not in_segment:
+            # Not allocated in shared memory (e.g. a compacted batch): copy once
+            if shm is not None and np.shares_memory(inputs, np.ndarray((shm.size,), dtype=np.uint8, buffer=shm.buf)):
+                inputs = inputs.copy()
+            staged = self.allocate(len(inputs))
+            staged[...] = inputs
+            inputs, shm = staged, self._local.shm
+
+        response, payload = self._request({"op": "forward", "shm": shm.name, "shape": list(inputs.shape)})
+        return np.frombuffer(payload, dtype=np.float32).reshape(response["shape"])
+
+
+class ModelServer:
+    """Owns the model and serves forward passes to API workers"""
+
+    def __init__(self, socket_path: Optional[str] = None):
+        from models.ml_model import FraudDetectionModel
+
+        self.socket_path = socket_path or settings.MODEL_SERVER_SOCKET
+        self.model = FraudDetectionModel()
+        self.max_batch_size = settings.BATCH_MAX_SIZE
+        self.max_wait_ms = settings.BATCH_MAX_WAIT_MS
+
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._has_items = asyncio.Event()
+        self._attached: "OrderedDict[str, shared_memory.SharedMemory]" = OrderedDict()
+
+    def _map(self, name: str, shape: list) -> np.ndarray:
+        """View a client's shared memory segment as an input batch"""
+        shm = self._attached.get(name)
+        if shm is None:
+            shm = _attach(name)
+            self._attached[name] = shm
+            # Keep a handful of mappings for clients' reused per-thread buffers
+            while len(self._attached) > 64:
+                evicted = self._attached.popitem(last=False)[1]
+                try:
+                    evicted.close()
+                except BufferError:
+                    # Still referenced by an in-flight batch; unmapped on GC
+                    pass
+        self._attached.move_to_end(name)
+        return np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                header = json.loads(await reader.readexactly(length))
+                try:
+                    if header["op"] == "info":
+                        response, payload = {
+                            "model_version": self.model.artifact_version,
+                            "input_shape": list(self.model.backend.input_shape),
+                            "output_shape": list(self.model.backend.output_shape),
+                        }, b""
+                    elif header["op"] == "forward":
+                        inputs = self._map(header["shm"], header["shape"])
+                        future = asyncio.get_running_loop().create_future()
+                        self._pending.append((inputs, future))
+                        self._has_items.set()
+                        outputs = await future
+                        response, payload = {"shape": list(outputs.shape)}, outputs.tobytes()
+                    else:
+                        response, payload = {"error": f"Unknown op: {header['op']}"}, b""
+                except Exception as e:
+                    response, payload = {"error": str(e)}, b""
+
+                response["payload_bytes"] = len(payload)
+                data = json.dumps(response).encode()
+                writer.write(_LENGTH.pack(len(data)) + data + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _batch_loop(self):
+        """Combine requests from all API workers into shared forward passes"""
+        while True:
+            await self._has_items.wait()
+            if self.max_wait_ms > 0:
+                await asyncio.sleep(self.max_wait_ms / 1000)
+
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch_size):
+                inputs, future = self._pending.pop(0)
+                batch.append((inputs, future))
+                size += len(inputs)
+            if not self._pending:
+                self._has_items.clear()
+
+            # A single request is passed straight from shared memory
+            if len(batch) == 1:
+                inputs = batch[0][0]
+            else:
+                inputs = np.concatenate([item[0] for item in batch])
+
+            try:
+                outputs = await asyncio.to_thread(self.model.forward, inputs)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for item, future in batch:
+                future.set_result(np.ascontiguousarray(outputs[offset:offset + len(item)], dtype=np.float32))
+                offset += len(item)
+
+    async def serve(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        print(f"✅ Model server listening on {self.socket_path}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self._batch_loop())
+
+
+if __name__ == "__main__":
+    asyncio.run(ModelServer().serve())
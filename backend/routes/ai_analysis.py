@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form, Request
 from typing import List
 import json
 
-from main import get_ml_model
+from config import settings
+from utils.model_loader import get_batch_scheduler, get_inference_executor, get_prediction_cache
 from schemas.ai_schemas import AIAnalysisResponse
-from utils.image_processor import save_upload_file, decode_base64_image
+from utils.image_processor import (
+    StreamedImage,
+    decode_base64_image,
+    read_base64_body,
+    read_image_body,
+)
+from utils.decode_admission import decode_admission
+from utils.image_sniffer import inspect_image
 
 router = APIRouter()
 
@@ -23,16 +31,19 @@ async def analyze_fraud(
     - Estimated repair cost
     """
     try:
-        # Get ML model
-        ml_model = get_ml_model()
-        if ml_model is None:
-            raise HTTPException(status_code=500, detail="AI model not loaded")
+        # Get inference scheduler (503 while the model is still loading)
+        scheduler = get_batch_scheduler()
         
         # Read image data
         image_data = await image.read()
         
+        # Check the true format and dimensions before anything decodes it
+        inspect_image(image_data)
+        
         # Run prediction
-        result = ml_model.predict_fraud(image_data)
+        result = await get_prediction_cache().get_or_predict(
+            image_data, decode_admission.guarded(scheduler.submit)
+        )
         
         # Convert to response model
         analysis_response = AIAnalysisResponse(
@@ -46,6 +57,8 @@ async def analyze_fraud(
         
         return analysis_response
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing image: {str(e)}")
 
@@ -58,16 +71,19 @@ async def analyze_fraud_base64(
     Analyze a base64 encoded image for fraud detection
     """
     try:
-        # Get ML model
-        ml_model = get_ml_model()
-        if ml_model is None:
-            raise HTTPException(status_code=500, detail="AI model not loaded")
+        # Get inference scheduler (503 while the model is still loading)
+        scheduler = get_batch_scheduler()
         
         # Decode base64 image
         image_data = decode_base64_image(image_base64)
         
+        # Check the true format and dimensions before anything decodes it
+        inspect_image(image_data)
+        
         # Run prediction
-        result = ml_model.predict_fraud(image_data)
+        result = await get_prediction_cache().get_or_predict(
+            image_data, decode_admission.guarded(scheduler.submit)
+        )
         
         # Convert to response model
         analysis_response = AIAnalysisResponse(
@@ -81,6 +97,75 @@ async def analyze_fraud_base64(
         
         return analysis_response
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing image: {str(e)}")
+
+
+async def _analyze_streamed(image: StreamedImage) -> AIAnalysisResponse:
+    """Predict for an image read from the request stream, reusing its digest for the cache"""
+    # Get inference scheduler (503 while the model is still loading)
+    scheduler = get_batch_scheduler()
+    
+    # Check the true format and dimensions before anything decodes it
+    inspect_image(image.data)
+    
+    # Run prediction
+    result = await get_prediction_cache().get_or_predict(
+        image.data, decode_admission.guarded(scheduler.submit), digest=image.digest
+    )
+    
+    # Convert to response model
+    return AIAnalysisResponse(
+        damage_severity=result["damage_severity"],
+        fraud_risk=result["fraud_risk"],
+        confidence_score=result["confidence_score"],
+        is_real_image=result["is_real_image"],
+        verification_checks=result["verification_checks"],
+        estimated_cost=result["estimated_cost"]
+    )
+
+
+@router.post("/fraud/raw", response_model=AIAnalysisResponse)
+async def analyze_fraud_raw(request: Request):
+    """
+    Analyze an image sent as the raw request body
+    
+    Send the image bytes with `Content-Type: application/octet-stream` or
+    `image/*`. Skips multipart parsing and base64 inflation entirely.
+    """
+    try:
+        # Fail fast while the model is still loading, before reading the body
+        get_batch_scheduler()
+        
+        image = await read_image_body(request)
+        return await _analyze_streamed(image)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing image: {str(e)}")
+
+
+@router.post("/fraud/base64/stream", response_model=AIAnalysisResponse)
+async def analyze_fraud_base64_stream(request: Request):
+    """
+    Analyze a base64 encoded image sent as the raw request body
+    
+    The body is the base64 text (a data URL prefix is allowed). It is
+    decoded incrementally as it arrives, so the encoded payload is never
+    held in memory as a whole.
+    """
+    try:
+        # Fail fast while the model is still loading, before reading the body
+        get_batch_scheduler()
+        
+        image = await read_base64_body(request)
+        return await _analyze_streamed(image)
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing image: {str(e)}")
 
@@ -105,38 +190,57 @@ async def analyze_batch(
     """
     Analyze multiple images in a batch
     
-    Maximum 10 images per request
+    All images are run through the model in a single forward pass.
+    Images that can't be decoded, or whose header shows an unsupported
+    format or too many pixels, are skipped. Maximum images per request
+    is set by MAX_BATCH_IMAGES.
     """
-    if len(images) > 10:
-        raise HTTPException(status_code=400, detail="Maximum 10 images per batch")
+    if len(images) > settings.MAX_BATCH_IMAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {settings.MAX_BATCH_IMAGES} images per batch"
+        )
     
     try:
-        # Get ML model
-        ml_model = get_ml_model()
-        if ml_model is None:
-            raise HTTPException(status_code=500, detail="AI model not loaded")
+        # Get inference executor (503 while the model is still loading)
+        executor = get_inference_executor()
         
-        results = []
+        # Read image data, skipping images whose header fails the format or pixel checks
+        accepted, images_data = [], []
         for image in images:
+            image_data = await image.read()
             try:
-                image_data = await image.read()
-                result = ml_model.predict_fraud(image_data)
-                
-                analysis_response = AIAnalysisResponse(
-                    damage_severity=result["damage_severity"],
-                    fraud_risk=result["fraud_risk"],
-                    confidence_score=result["confidence_score"],
-                    is_real_image=result["is_real_image"],
-                    verification_checks=result["verification_checks"],
-                    estimated_cost=result["estimated_cost"]
-                )
-                results.append(analysis_response)
-            except Exception as e:
+                inspect_image(image_data)
+            except HTTPException as e:
+                print(f"Error analyzing image {image.filename}: {e.detail}")
+                continue
+            accepted.append(image)
+            images_data.append(image_data)
+        
+        # Run one batched prediction for images not already cached
+        batch_results = await get_prediction_cache().get_or_predict_many(
+            images_data, decode_admission.guarded_batch(executor.predict_batch)
+        ) if images_data else []
+        
+        results = []
+        for image, result in zip(accepted, batch_results):
+            if "error" in result:
                 # Continue with other images even if one fails
-                print(f"Error analyzing image {image.filename}: {str(e)}")
+                print(f"Error analyzing image {image.filename}: {result['error']}")
                 continue
+            
+            results.append(AIAnalysisResponse(
+                damage_severity=result["damage_severity"],
+                fraud_risk=result["fraud_risk"],
+                confidence_score=result["confidence_score"],
+                is_real_image=result["is_real_image"],
+                verification_checks=result["verification_checks"],
+                estimated_cost=result["estimated_cost"]
+            ))
         
         return results
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in batch analysis: {str(e)}")
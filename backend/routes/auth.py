@@ -4,7 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import uuid
 
-from models.database import get_db, User
+from models.database import get_db, get_read_db, User
 from schemas.user_schemas import UserCreate, UserResponse, Token, UserLogin
 from utils.auth_utils import (
     get_password_hash,
@@ -55,7 +55,7 @@ async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Login user and return JWT token"""
     # Get user by email
@@ -79,7 +79,7 @@ async def login(
 
 
 @router.post("/login-json", response_model=Token)
-async def login_json(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
+async def login_json(user_data: UserLogin, db: AsyncSession = Depends(get_read_db)):
     """Login user with JSON body (alternative to form data)"""
     # Get user by email
     result = await db.execute(select(User).where(User.email == user_data.email))
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
-from typing import List, Optional
+from sqlalchemy import select, desc, delete, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+from typing import Any, Dict, List, Optional
+import asyncio
 import uuid
-import json
 from datetime import datetime
 
-from models.database import get_db, Claim, User, AIAnalysisResult
-from schemas.claim_schemas import ClaimCreate, ClaimResponse, ClaimUpdate, VehicleInfo
+from config import settings
+from models.database import get_db, get_read_db, Claim, User, AIAnalysisResult, AnalysisJob, AnalysisStatus, Comment
+from schemas.claim_schemas import ClaimCreate, ClaimResponse, ClaimUpdate, ClaimAnalysisStatus, ClaimStats, ClaimImportResult
 from schemas.ai_schemas import AIAnalysisCreate
 from utils.auth_utils import get_current_active_user
-from utils.image_processor import save_upload_file
-from main import get_ml_model
+from utils.claim_stats import get_claim_stats, record_analysis, record_claim, record_status_change
+from utils.claim_transfer import EXPORT_MEDIA_TYPES, ClaimImporter, export_csv, export_ndjson, export_query, read_csv, read_ndjson
+from utils.analysis_queue import FINISHED_STATUSES, analysis_queue, analysis_response_data, get_analysis_status, read_analysis_status
+from utils.image_derivatives import derivative_generator, image_url, image_urls
+from utils.image_processor import ingest_upload
+from utils.pagination import encode_cursor, decode_cursor
+from utils.storage import acquire_blobs, release_blobs
 
 router = APIRouter()
 
@@ -23,6 +31,24 @@ def generate_claim_number() -> str:
     return f"CLM-{timestamp}-{random_part}"
 
 
+def claims_with_relations():
+    """Select claims with their AI analysis (joined) and comments (one extra query per page)"""
+    return select(Claim).options(
+        joinedload(Claim.ai_analysis),
+        selectinload(Claim.comments),
+    )
+
+
+async def load_claim(db: AsyncSession, claim_id: str) -> Optional[Claim]:
+    """Fetch one claim with its relationships, refreshing any copy already in the session"""
+    result = await db.execute(
+        claims_with_relations()
+        .where(Claim.id == claim_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.unique().scalar_one_or_none()
+
+
 @router.post("", response_model=ClaimResponse, status_code=status.HTTP_201_CREATED)
 async def create_claim(
     claimant_name: str = Form(...),
@@ -42,14 +68,13 @@ async def create_claim(
     """
     Create a new insurance claim with optional images
     
-    Images will be automatically analyzed by the AI model
+    Returns immediately with `analysis_status: pending_analysis`; the images
+    are analyzed in the background. Poll `/{claim_id}/analysis` or subscribe
+    to `/{claim_id}/analysis/events` to learn when the result is ready.
     """
     try:
-        # Save uploaded images
-        image_paths = []
-        for image in images:
-            file_path = await save_upload_file(image)
-            image_paths.append(file_path)
+        # Read, hash and save each image once, keeping its bytes for analysis
+        uploads = [await ingest_upload(image) for image in images]
         
         # Create claim
         new_claim = Claim(
@@ -64,58 +89,35 @@ async def create_claim(
             incident_date=incident_date,
             location=location,
             description=description,
-            images=json.dumps(image_paths),
+            images=[upload.key for upload in uploads],
+            analysis_status=AnalysisStatus.PENDING_ANALYSIS if uploads else None,
             policy_number=policy_number,
             policy_type=policy_type
         )
-        
         db.add(new_claim)
+        await record_claim(db, new_claim)
+        
+        # Identical photos share one stored blob; count this claim's references
+        await acquire_blobs(db, [upload.key for upload in uploads], [upload.size for upload in uploads])
+        
+        # Images are analyzed in the background; the job row commits with the claim
+        if uploads:
+            db.add(AnalysisJob(claim_id=new_claim.id, status=AnalysisStatus.PENDING_ANALYSIS))
+        
         await db.commit()
-        await db.refresh(new_claim)
         
-        # If images provided, run AI analysis on the first image
-        if images and len(images) > 0:
-            try:
-                ml_model = get_ml_model()
-                if ml_model:
-                    # Read first image
-                    await images[0].seek(0)  # Reset file pointer
-                    image_data = await images[0].read()
-                    
-                    # Run prediction
-                    result = ml_model.predict_fraud(image_data)
-                    
-                    # Save AI analysis result
-                    ai_analysis = AIAnalysisResult(
-                        id=str(uuid.uuid4()),
-                        claim_id=new_claim.id,
-                        damage_severity=result["damage_severity"],
-                        fraud_risk=result["fraud_risk"],
-                        confidence_score=result["confidence_score"],
-                        is_real_image=result["is_real_image"],
-                        gps_match=result["verification_checks"]["gps_match"],
-                        time_match=result["verification_checks"]["time_match"],
-                        vin_match=result["verification_checks"]["vin_match"],
-                        estimated_cost=result["estimated_cost"],
-                        raw_prediction=json.dumps(result.get("raw_prediction", []))
-                    )
-                    
-                    db.add(ai_analysis)
-                    new_claim.damage_type = result["damage_severity"]
-                    await db.commit()
-                    await db.refresh(new_claim)
-            except Exception as e:
-                print(f"Warning: AI analysis failed: {str(e)}")
+        if uploads:
+            analysis_queue.enqueue(new_claim.id, uploads)
+            for upload in uploads:
+                derivative_generator.schedule(upload.key, upload.data)
         
         # Load relationships
-        result = await db.execute(
-            select(Claim).where(Claim.id == new_claim.id)
-        )
-        claim_with_relations = result.scalar_one()
+        claim_with_relations = await load_claim(db, new_claim.id)
         
-        # Convert to response
-        return convert_claim_to_response(claim_with_relations)
+        return ORJSONResponse(claim_response_data(claim_with_relations), status_code=status.HTTP_201_CREATED)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating claim: {str(e)}")
 
@@ -125,34 +127,166 @@ async def list_claims(
     status: Optional[str] = None,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    List all claims for the current user
+    List all claims for the current user, newest first
     
-    Supports filtering by status and pagination
+    Supports filtering by status. Pass the `X-Next-Cursor` header of a page
+    as `cursor` to fetch the next one; its cost does not grow with depth,
+    unlike `offset`, which is kept for compatibility. The header is absent
+    on the last page.
     """
-    query = select(Claim).where(Claim.claimant_id == current_user.id)
+    query = claims_with_relations().where(Claim.claimant_id == current_user.id)
     
     if status:
         query = query.where(Claim.status == status)
     
-    query = query.order_by(desc(Claim.created_at)).limit(limit).offset(offset)
+    if cursor:
+        # Seek past the last row seen, along ix_claims_claimant_created_id
+        query = query.where(tuple_(Claim.created_at, Claim.id) < decode_cursor(cursor))
+    elif offset:
+        query = query.offset(offset)
+    
+    query = query.order_by(desc(Claim.created_at), desc(Claim.id)).limit(limit)
     
     result = await db.execute(query)
-    claims = result.scalars().all()
+    claims = result.unique().scalars().all()
+    
+    headers = {}
+    if claims and len(claims) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(claims[-1].created_at, claims[-1].id)
+    
+    return ORJSONResponse([claim_response_data(claim) for claim in claims], headers=headers)
+
+
+@router.get("/stats", response_model=ClaimStats)
+async def get_claims_stats(
+    days: int = Query(30, ge=1, le=366),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Dashboard statistics for the current user's claims
+    
+    Counts by status and fraud risk, total estimated cost, and the same per
+    filing day for the last `days` days. Served from running aggregates, so
+    the cost does not grow with the number of claims.
+    """
+    return await get_claim_stats(db, current_user.id, days)
+
+
+@router.get("/export")
+async def export_claims(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Stream claims with their AI analysis as NDJSON or CSV
+    
+    Admins export every claim, other users their own. Rows are
+    read from a server-side cursor and written as they arrive, so memory
+    stays flat however many claims there are.
+    """
+    query = export_query()
+    # Same rule as viewing a single claim: others' claims are admin-only
+    if current_user.role.value != "admin":
+        query = query.where(Claim.claimant_id == current_user.id)
+    if status:
+        query = query.where(Claim.status == status)
+    query = query.order_by(Claim.created_at, Claim.id)
+    
+    # The export streams from its own session; release this one's connection
+    await db.close()
+    
+    filename = f"claims-{datetime.utcnow():%Y%m%d}.{export_format}"
+    return StreamingResponse(
+        export_csv(query) if export_format == "csv" else export_ndjson(query),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import", response_model=ClaimImportResult)
+async def import_claims(
+    request: Request,
+    import_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Bulk-import claims from an NDJSON or CSV request body
+    
+    Admins and agents only, since rows may carry a status and AI verdict.
+    Uses the export's columns (`id`, `images` and other server-managed
+    fields are ignored). Claims belong to the caller; admins may set
+    `claimant_id`. The body is parsed as it streams in and inserted in
+    batches of `IMPORT_BATCH_SIZE`. Invalid rows are skipped and reported
+    with their row number.
+    """
+    # Only admins and agents can import claims
+    if current_user.role.value not in ["admin", "agent"]:
+        raise HTTPException(status_code=403, detail="Not authorized to import claims")
     
-    return [convert_claim_to_response(claim) for claim in claims]
+    records = read_csv(request.stream()) if import_format == "csv" else read_ndjson(request.stream())
+    return await ClaimImporter(db, current_user, generate_claim_number).run(records)
 
 
 @router.get("/{claim_id}", response_model=ClaimResponse)
 async def get_claim(
     claim_id: str,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific claim by ID"""
+    claim = await load_claim(db, claim_id)
+    
+    if not claim:
+        raise HTTPException(status_code=404, detail="Claim not found")
+    
+    # Check ownership (unless admin)
+    if claim.claimant_id != current_user.id and current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view this claim")
+    
+    return ORJSONResponse(claim_response_data(claim))
+
+
+@router.get("/{claim_id}/analysis", response_model=ClaimAnalysisStatus)
+async def get_claim_analysis(
+    claim_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Poll the background AI analysis of a claim"""
+    result = await db.execute(select(Claim).where(Claim.id == claim_id))
+    claim = result.scalar_one_or_none()
+    
+    if not claim:
+        raise HTTPException(status_code=404, detail="Claim not found")
+    
+    # Check ownership (unless admin)
+    if claim.claimant_id != current_user.id and current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view this claim")
+    
+    return await get_analysis_status(db, claim)
+
+
+@router.get("/{claim_id}/analysis/events")
+async def stream_claim_analysis(
+    claim_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Server-sent events for the background AI analysis of a claim
+    
+    Sends the current state right away, then every change, and closes once
+    the analysis has completed or failed.
+    """
     result = await db.execute(select(Claim).where(Claim.id == claim_id))
     claim = result.scalar_one_or_none()
     
@@ -163,7 +297,41 @@ async def get_claim(
     if claim.claimant_id != current_user.id and current_user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to view this claim")
     
-    return convert_claim_to_response(claim)
+    # Subscribe before reading the state so no update falls in between
+    updates = analysis_queue.subscribe(claim_id)
+    current = await get_analysis_status(db, claim)
+    
+    # The session would otherwise hold a pooled connection until the stream ends
+    await db.close()
+    
+    async def events():
+        try:
+            update = current
+            while True:
+                yield f"event: analysis\ndata: {update.model_dump_json()}\n\n"
+                if update.analysis_status is None or update.analysis_status in FINISHED_STATUSES:
+                    return
+                while True:
+                    try:
+                        update = await asyncio.wait_for(updates.get(), settings.ANALYSIS_EVENTS_KEEPALIVE)
+                        break
+                    except asyncio.TimeoutError:
+                        # The job may be running in another worker process; check the database
+                        latest = await read_analysis_status(claim_id)
+                        if latest is None:
+                            return
+                        if (latest.analysis_status, latest.attempts) != (update.analysis_status, update.attempts):
+                            update = latest
+                            break
+                        yield ": keepalive\n\n"
+        finally:
+            analysis_queue.unsubscribe(claim_id, updates)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.put("/{claim_id}", response_model=ClaimResponse)
@@ -174,8 +342,7 @@ async def update_claim(
     db: AsyncSession = Depends(get_db)
 ):
     """Update a claim's status or damage type"""
-    result = await db.execute(select(Claim).where(Claim.id == claim_id))
-    claim = result.scalar_one_or_none()
+    claim = await load_claim(db, claim_id)
     
     if not claim:
         raise HTTPException(status_code=404, detail="Claim not found")
@@ -185,17 +352,21 @@ async def update_claim(
         raise HTTPException(status_code=403, detail="Not authorized to update claims")
     
     # Update fields
+    old_status = claim.status
     if claim_update.status:
         claim.status = claim_update.status
     if claim_update.damage_type:
         claim.damage_type = claim_update.damage_type
     if claim_update.description:
         claim.description = claim_update.description
+    await record_status_change(db, claim, old_status)
     
     await db.commit()
-    await db.refresh(claim)
     
-    return convert_claim_to_response(claim)
+    # Reload with onupdate columns and relationships in the same round trip
+    claim = await load_claim(db, claim_id)
+    
+    return ORJSONResponse(claim_response_data(claim))
 
 
 @router.delete("/{claim_id}")
@@ -215,56 +386,58 @@ async def delete_claim(
     if claim.claimant_id != current_user.id and current_user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to delete this claim")
     
+    analysis = (await db.execute(
+        select(AIAnalysisResult.fraud_risk, AIAnalysisResult.estimated_cost)
+        .where(AIAnalysisResult.claim_id == claim_id)
+    )).first()
+    await record_claim(db, claim, sign=-1)
+    if analysis:
+        await record_analysis(db, claim, *analysis, sign=-1)
+    
+    # Children first, so the flush never lazy-loads them to null out claim_id
+    await db.execute(delete(AnalysisJob).where(AnalysisJob.claim_id == claim_id))
+    await db.execute(delete(AIAnalysisResult).where(AIAnalysisResult.claim_id == claim_id))
+    await db.execute(delete(Comment).where(Comment.claim_id == claim_id))
+    await release_blobs(db, claim.images or [])
     await db.delete(claim)
     await db.commit()
     
     return {"message": "Claim deleted successfully"}
 
 
-def convert_claim_to_response(claim: Claim) -> ClaimResponse:
-    """Convert Claim model to ClaimResponse schema"""
-    from schemas.ai_schemas import AIAnalysisResponse, VerificationChecks
-    
-    # Parse images
-    images = json.loads(claim.images) if claim.images else []
-    
-    # Convert AI analysis if present
-    ai_analysis = None
-    if claim.ai_analysis:
-        ai_analysis = AIAnalysisResponse(
-            damage_severity=claim.ai_analysis.damage_severity,
-            fraud_risk=claim.ai_analysis.fraud_risk,
-            confidence_score=claim.ai_analysis.confidence_score,
-            is_real_image=claim.ai_analysis.is_real_image,
-            verification_checks=VerificationChecks(
-                gps_match=claim.ai_analysis.gps_match,
-                time_match=claim.ai_analysis.time_match,
-                vin_match=claim.ai_analysis.vin_match
-            ),
-            estimated_cost=claim.ai_analysis.estimated_cost
-        )
+def claim_response_data(claim: Claim) -> Dict[str, Any]:
+    """
+    Map a Claim row (relationships loaded) straight to the ClaimResponse JSON shape
     
-    return ClaimResponse(
-        id=claim.id,
-        claim_number=claim.claim_number,
-        claimant_id=claim.claimant_id,
-        claimant_name=claim.claimant_name,
-        vehicle_info=VehicleInfo(
-            make=claim.vehicle_make,
-            model=claim.vehicle_model,
-            year=claim.vehicle_year,
-            vin=claim.vehicle_vin
-        ),
-        incident_date=claim.incident_date,
-        location=claim.location,
-        description=claim.description,
-        images=images,
-        status=claim.status,
-        damage_type=claim.damage_type,
-        ai_analysis=ai_analysis,
-        policy_number=claim.policy_number,
-        policy_type=claim.policy_type,
-        created_at=claim.created_at,
-        updated_at=claim.updated_at,
-        comments=[]
-    )
+    Routes return this in an ORJSONResponse, so the rows are serialized once
+    instead of being built into models that FastAPI validates again.
+    """
+    return {
+        "id": claim.id,
+        "claim_number": claim.claim_number,
+        "claimant_id": claim.claimant_id,
+        "claimant_name": claim.claimant_name,
+        "vehicle_info": {
+            "make": claim.vehicle_make,
+            "model": claim.vehicle_model,
+            "year": claim.vehicle_year,
+            "vin": claim.vehicle_vin,
+        },
+        "incident_date": claim.incident_date,
+        "location": claim.location,
+        "description": claim.description,
+        "images": [image_url(key) for key in claim.images or []],
+        "image_derivatives": [image_urls(key) for key in claim.images or []],
+        "status": claim.status,
+        "damage_type": claim.damage_type,
+        "analysis_status": claim.analysis_status,
+        "ai_analysis": analysis_response_data(claim.ai_analysis),
+        "policy_number": claim.policy_number,
+        "policy_type": claim.policy_type,
+        "created_at": claim.created_at,
+        "updated_at": claim.updated_at,
+        "comments": [
+            {"author": comment.author, "content": comment.content, "id": comment.id, "timestamp": comment.timestamp}
+            for comment in claim.comments
+        ],
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -45,4 +45,4 @@ class AIAnalysisCreate(BaseModel):
     time_match: bool = True
     vin_match: bool = True
     estimated_cost: float
-    raw_prediction: Optional[str] = None
+    raw_prediction: Optional[Dict[str, Any]] = None
@@ -1,9 +1,9 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime
+from typing import Dict, Optional, List
+from datetime import date, datetime
 from enum import Enum
 
-from schemas.ai_schemas import AIAnalysisResponse
+from schemas.ai_schemas import AIAnalysisResponse, FraudRisk
 
 
 class ClaimStatus(str, Enum):
@@ -20,6 +20,13 @@ class DamageType(str, Enum):
     SEVERE = "severe"
 
 
+class AnalysisStatus(str, Enum):
+    PENDING_ANALYSIS = "pending_analysis"
+    ANALYZING = "analyzing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class VehicleInfo(BaseModel):
     make: str
     model: str
@@ -27,6 +34,12 @@ class VehicleInfo(BaseModel):
     vin: Optional[str] = None
 
 
+class ClaimImage(BaseModel):
+    url: str
+    thumbnail_url: str
+    medium_url: str
+
+
 class CommentBase(BaseModel):
     author: str
     content: str
@@ -70,8 +83,10 @@ class ClaimResponse(BaseModel):
     location: str
     description: str
     images: List[str]
+    image_derivatives: List[ClaimImage] = []
     status: ClaimStatus
     damage_type: Optional[DamageType] = None
+    analysis_status: Optional[AnalysisStatus] = None
     ai_analysis: Optional[AIAnalysisResponse] = None
     policy_number: str
     policy_type: str
@@ -81,3 +96,66 @@ class ClaimResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class ClaimAnalysisStatus(BaseModel):
+    claim_id: str
+    analysis_status: Optional[AnalysisStatus] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    ai_analysis: Optional[AIAnalysisResponse] = None
+
+
+class ClaimStatsBucket(BaseModel):
+    claims: int = 0
+    by_status: Dict[ClaimStatus, int]
+    by_fraud_risk: Dict[FraudRisk, int]
+    estimated_cost: float = 0.0  # Sum over analyzed claims
+
+
+class ClaimStatsDay(ClaimStatsBucket):
+    day: date
+
+
+class ClaimStats(ClaimStatsBucket):
+    daily: List[ClaimStatsDay] = []  # Claims by filing day, oldest first, including empty days
+
+
+class ClaimImportRow(BaseModel):
+    """One claim of a bulk import; the columns match the export, and unknown ones are ignored"""
+    claim_number: Optional[str] = None  # Generated when absent
+    claimant_id: Optional[str] = None  # Honoured for admins only
+    claimant_name: str
+    vehicle_make: str
+    vehicle_model: str
+    vehicle_year: int = Field(..., ge=1900, le=2100)
+    vehicle_vin: Optional[str] = None
+    incident_date: str
+    location: str
+    description: str
+    status: ClaimStatus = ClaimStatus.PENDING
+    damage_type: Optional[DamageType] = None
+    policy_number: str
+    policy_type: str
+    created_at: Optional[datetime] = None
+    
+    # AI analysis, imported when a fraud risk is given
+    ai_damage_severity: Optional[DamageType] = None
+    ai_fraud_risk: Optional[FraudRisk] = None
+    ai_confidence_score: Optional[float] = Field(None, ge=0.0, le=1.0)
+    ai_is_real_image: Optional[bool] = None
+    ai_gps_match: Optional[bool] = None
+    ai_time_match: Optional[bool] = None
+    ai_vin_match: Optional[bool] = None
+    ai_estimated_cost: Optional[float] = Field(None, ge=0.0)
+
+
+class ClaimImportError(BaseModel):
+    row: int  # Line number for NDJSON, data record number for CSV
+    error: str
+
+
+class ClaimImportResult(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: List[ClaimImportError] = []  # The first IMPORT_MAX_REPORTED_ERRORS failures
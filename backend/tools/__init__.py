@@ -0,0 +1 @@
+# Empty file to make tools a package
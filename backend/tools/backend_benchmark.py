@@ -0,0 +1,79 @@
+"""
+Measure latency and memory of each inference backend
+
+Each backend is loaded in its own fresh process so peak RSS reflects
+that runtime alone (TensorFlow vs tflite_runtime). Prints JSON.
+
+Usage:
+    python -m tools.backend_benchmark --backends keras tflite --batch-sizes 1 8 32
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+
+import numpy as np
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_backend(backend: str, batch_sizes: list, iterations: int) -> dict:
+    """Load one backend and time forward passes (runs in a child process)"""
+    from config import settings
+    from models.backends import default_model_path, load_backend
+
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    model = load_backend(backend, default_model_path(backend))
+    report = {
+        "load_ms": round((time.perf_counter() - started) * 1000, 1),
+        "rss_before_load_mb": rss_before,
+        "rss_after_load_mb": peak_rss_mb(),
+        "batch_sizes": {},
+    }
+
+    width, height = settings.IMAGE_SIZE
+    rng = np.random.default_rng(0)
+    for batch_size in batch_sizes:
+        inputs = rng.random((batch_size, height, width, 3), dtype=np.float32)
+        model.forward(inputs)
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            model.forward(inputs)
+            samples.append((time.perf_counter() - started) * 1000)
+        report["batch_sizes"][batch_size] = {
+            "p50_ms": round(float(np.percentile(samples, 50)), 3),
+            "p95_ms": round(float(np.percentile(samples, 95)), 3),
+            "images_per_s": round(batch_size * 1000 / float(np.mean(samples)), 1),
+        }
+
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["keras", "tflite"])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    report = {}
+    for backend in args.backends:
+        with context.Pool(1) as pool:
+            report[backend] = pool.apply(run_backend, (backend, args.batch_sizes, args.iterations))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
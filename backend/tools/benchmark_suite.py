@@ -0,0 +1,189 @@
+"""
+Inference-path benchmark suite
+
+Measures the stages of predict_fraud (decode + preprocess, forward pass,
+result mapping) on synthetic JPEG/PNG/WebP photos at phone resolutions,
+throughput of predict_batch by batch size, and the /api/analyze/*
+endpoints in-process through the ASGI app at several concurrency levels.
+Runs offline with a stand-in model when the real model file is missing.
+
+Results are written as JSON so runs can be diffed against each other.
+
+Usage:
+    python -m tools.benchmark_suite --output bench.json
+    python -m tools.benchmark_suite --formats JPEG --resolutions 12mp --iterations 10
+"""
+import argparse
+import asyncio
+import base64
+import json
+import platform
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from config import settings
+from tools.backend_benchmark import peak_rss_mb
+from tools.synthetic import PHONE_RESOLUTIONS, load_model_or_stand_in, synthetic_image, synthetic_images
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "mean_ms": round(float(np.mean(samples)), 3),
+    }
+
+
+def timed(fn: Callable, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def bench_stages(model, image_data: bytes, iterations: int) -> dict:
+    """Per-stage latency of the single-image predict_fraud path"""
+    buffer = model._allocate(1)
+    preprocess, forward, mapping, total = [], [], [], []
+    for _ in range(iterations):
+        preprocess.append(timed(model.preprocess_image_into, image_data, buffer[0]))
+        started = time.perf_counter()
+        prediction = model.forward(buffer)
+        forward.append((time.perf_counter() - started) * 1000)
+        mapping.append(timed(model._build_results, prediction))
+        total.append(timed(model.predict_fraud, image_data))
+    return {
+        "bytes": len(image_data),
+        "preprocess": percentiles(preprocess),
+        "forward": percentiles(forward),
+        "result_mapping": percentiles(mapping),
+        "predict_fraud": percentiles(total),
+    }
+
+
+def bench_batches(model, images: List[bytes], batch_sizes: List[int], iterations: int) -> dict:
+    """predict_batch latency and throughput by batch size"""
+    results = {}
+    for batch_size in batch_sizes:
+        batch = (images * (batch_size // len(images) + 1))[:batch_size]
+        model.predict_batch(batch)
+        samples = [timed(model.predict_batch, batch) for _ in range(iterations)]
+        results[batch_size] = {
+            **percentiles(samples),
+            "images_per_s": round(batch_size * 1000 / float(np.mean(samples)), 1),
+        }
+    return results
+
+
+async def bench_endpoints(model, images: List[bytes], concurrency_levels: List[int], requests: int) -> dict:
+    """/api/analyze/* through the ASGI app, with the model installed directly"""
+    import httpx
+
+    from main import app
+    from utils.inference_executor import InferenceExecutor
+    from utils.model_loader import model_loader
+    from utils.prediction_cache import PredictionCache
+
+    # Caching would turn repeated images into hits, so it's disabled here
+    await model_loader.install(
+        model,
+        InferenceExecutor(model=model, kind="thread"),
+        prediction_cache=PredictionCache(model.model_version, max_entries=0, persistent=False),
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    endpoints = {
+        "fraud": lambda client, data: client.post(
+            "/api/analyze/fraud", files={"image": ("claim.jpg", data, "image/jpeg")}
+        ),
+        "fraud_base64": lambda client, data: client.post(
+            "/api/analyze/fraud/base64", data={"image_base64": base64.b64encode(data).decode()}
+        ),
+        "batch": lambda client, data: client.post(
+            "/api/analyze/batch", files=[("images", (f"claim_{i}.jpg", data, "image/jpeg")) for i in range(8)]
+        ),
+    }
+
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for name, send in endpoints.items():
+                results[name] = {}
+                for concurrency in concurrency_levels:
+                    semaphore = asyncio.Semaphore(concurrency)
+                    latencies = []
+
+                    async def one(i: int):
+                        async with semaphore:
+                            started = time.perf_counter()
+                            response = await send(client, images[i % len(images)])
+                            response.raise_for_status()
+                            latencies.append((time.perf_counter() - started) * 1000)
+
+                    started = time.perf_counter()
+                    await asyncio.gather(*[one(i) for i in range(requests)])
+                    elapsed = time.perf_counter() - started
+                    results[name][concurrency] = {
+                        **percentiles(latencies),
+                        "requests_per_s": round(requests / elapsed, 1),
+                    }
+        results["batching"] = model_loader.batch_scheduler.stats()
+    finally:
+        await model_loader.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", nargs="+", default=["JPEG", "PNG", "WEBP"])
+    parser.add_argument("--resolutions", nargs="+", default=list(PHONE_RESOLUTIONS), choices=list(PHONE_RESOLUTIONS))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=64, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--skip-endpoints", action="store_true")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    model = load_model_or_stand_in()
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "model_backend": model.backend.name,
+            "model_version": model.model_version,
+            "fast_preprocess": model.fast_preprocess,
+            "image_size": list(settings.IMAGE_SIZE),
+        },
+        "stages": {},
+    }
+
+    for image_format in args.formats:
+        for resolution in args.resolutions:
+            image_data = synthetic_image(PHONE_RESOLUTIONS[resolution], image_format)
+            report["stages"][f"{image_format.lower()}_{resolution}"] = bench_stages(model, image_data, args.iterations)
+
+    images = list(synthetic_images(8, PHONE_RESOLUTIONS["12mp"]).values())
+    report["batch_throughput"] = bench_batches(model, images, args.batch_sizes, args.iterations)
+
+    if not args.skip_endpoints:
+        report["endpoints"] = asyncio.run(bench_endpoints(model, images, args.concurrency, args.requests))
+
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"✅ Benchmark results written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
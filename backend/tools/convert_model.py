@@ -0,0 +1,91 @@
+"""
+Convert the Keras model to a TFLite artifact for the tflite backend
+
+Writes the converted model and checks its outputs against the Keras
+model on random inputs, printing a JSON parity report.
+
+Usage:
+    python -m tools.convert_model --output ../cars_claim_model.tflite
+"""
+import argparse
+import json
+import sys
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+
+from config import settings
+from models.backends import KerasBackend, TFLiteBackend
+
+
+def convert(
+    keras_backend: KerasBackend,
+    output_path: str,
+    quantization: str = "none",
+    representative_dataset: Optional[Callable[[], Iterator[list]]] = None,
+) -> int:
+    """
+    Convert a loaded Keras model to TFLite, returning the artifact size
+
+    `quantization` is one of "none", "float16" (float16 weights),
+    "dynamic" (dynamic-range int8 weights) or "int8" (int8 weights and
+    activations calibrated on `representative_dataset`). Inputs and outputs
+    stay float32 so the artifact is a drop-in replacement.
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_backend.model)
+    if quantization != "none":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        if representative_dataset is None:
+            raise ValueError("int8 quantization needs a representative dataset")
+        converter.representative_dataset = representative_dataset
+    elif quantization not in ("none", "dynamic"):
+        raise ValueError(f"Unknown quantization: {quantization}")
+    tflite_model = converter.convert()
+    with open(output_path, "wb") as f:
+        f.write(tflite_model)
+    return len(tflite_model)
+
+
+def check_parity(reference, candidate, samples: int = 32, batch_size: int = 8) -> dict:
+    """Compare two backends' raw outputs on the same random inputs"""
+    width, height = settings.IMAGE_SIZE
+    rng = np.random.default_rng(0)
+    diffs = []
+    for _ in range(max(1, samples // batch_size)):
+        inputs = rng.random((batch_size, height, width, 3), dtype=np.float32)
+        diffs.append(np.abs(reference.forward(inputs) - candidate.forward(inputs)))
+    diffs = np.concatenate(diffs)
+    return {
+        "max_abs_diff": float(diffs.max()),
+        "mean_abs_diff": float(diffs.mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.MODEL_PATH, help="Source Keras model")
+    parser.add_argument("--output", default=settings.TFLITE_MODEL_PATH, help="Where to write the .tflite model")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="Max allowed absolute output difference")
+    args = parser.parse_args()
+
+    keras_backend = KerasBackend(args.model, compiled=True)
+    size = convert(keras_backend, args.output)
+
+    report = {
+        "source": args.model,
+        "output": args.output,
+        "size_bytes": size,
+        "parity": check_parity(keras_backend, TFLiteBackend(args.output)),
+        "tolerance": args.tolerance,
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["parity"]["max_abs_diff"] <= args.tolerance else 1)
+
+
+if __name__ == "__main__":
+    main()
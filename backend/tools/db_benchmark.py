@@ -0,0 +1,142 @@
+"""
+Compare database engine profiles under concurrent read and write load
+
+For each profile, creates a scratch SQLite database seeded with claims,
+then runs reader tasks (the claim listing query) and writer tasks (new
+claims with a comment) together for a fixed time. Readers in the
+"default" profile commit like the old get_db did; in "production" they
+use read-only sessions. Reports throughput, latency percentiles and
+errors such as "database is locked". Prints JSON.
+
+Usage:
+    python -m tools.db_benchmark --readers 16 --writers 4 --duration 10
+    python -m tools.db_benchmark --profiles default --echo  # pre-profile setup, SQL logged to /dev/null
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from sqlalchemy import desc
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+
+from config import settings
+from models import database
+from models.database import DATABASE_PROFILES, Claim, Comment
+from routes.claims import claims_with_relations
+from tools.query_count import seed
+
+
+def _latency_summary(latencies: list) -> dict:
+    if not latencies:
+        return {"count": 0}
+    ms = np.array(latencies) * 1000
+    return {
+        "count": len(latencies),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+async def run_load(profile: str, user, readers: int, writers: int, duration: float, page_size: int) -> dict:
+    commit_reads = profile == "default"
+    latencies = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    deadline = time.perf_counter() + duration
+
+    async def read():
+        async with database.async_session_maker() as session:
+            result = await session.execute(
+                claims_with_relations()
+                .where(Claim.claimant_id == user.id)
+                .order_by(desc(Claim.created_at), desc(Claim.id))
+                .limit(page_size)
+            )
+            result.unique().scalars().all()
+            if commit_reads:
+                await session.commit()
+
+    async def write():
+        async with database.async_session_maker() as session:
+            claim_id = str(uuid.uuid4())
+            session.add(Claim(
+                id=claim_id, claim_number=f"CLM-{uuid.uuid4().hex[:12]}", claimant_id=user.id,
+                claimant_name="Fleet", vehicle_make="Toyota", vehicle_model="Corolla", vehicle_year=2020,
+                incident_date="2024-01-01", location="Lagos", description="Side mirror",
+                images=[], policy_number="P-1", policy_type="comprehensive",
+            ))
+            session.add(Comment(id=str(uuid.uuid4()), claim_id=claim_id, author="agent", content="Filed"))
+            await session.commit()
+
+    async def worker(kind: str, operation):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                await operation()
+            except (OperationalError, PoolTimeoutError):
+                errors[kind] += 1
+                continue
+            latencies[kind].append(time.perf_counter() - started)
+
+    await asyncio.gather(
+        *(worker("read", read) for _ in range(readers)),
+        *(worker("write", write) for _ in range(writers)),
+    )
+    return {
+        kind: {
+            **_latency_summary(latencies[kind]),
+            "per_second": round(len(latencies[kind]) / duration, 1),
+            "errors": errors[kind],
+        }
+        for kind in ("read", "write")
+    }
+
+
+async def benchmark_profile(profile: str, directory: str, args) -> dict:
+    settings.DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(directory, f'{profile}.db')}"
+    settings.DATABASE_PROFILE = profile
+    settings.DATABASE_ECHO = args.echo and profile == "default"
+
+    await database.init_db()
+    user = await seed(args.claims, args.comments)
+    try:
+        return await run_load(profile, user, args.readers, args.writers, args.duration, args.page_size)
+    finally:
+        await database.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["default", "production"], choices=DATABASE_PROFILES)
+    parser.add_argument("--readers", type=int, default=16, help="Concurrent reader tasks")
+    parser.add_argument("--writers", type=int, default=4, help="Concurrent writer tasks")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per profile")
+    parser.add_argument("--claims", type=int, default=1000, help="Claims seeded before the run")
+    parser.add_argument("--comments", type=int, default=2, help="Comments per seeded claim")
+    parser.add_argument("--page-size", type=int, default=50, help="Claims per listed page")
+    parser.add_argument("--echo", action="store_true", help="Log SQL in the default profile, as DEBUG=True used to")
+    args = parser.parse_args()
+
+    report = {
+        "readers": args.readers,
+        "writers": args.writers,
+        "duration_s": args.duration,
+        "profiles": {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in args.profiles:
+            # Echoed SQL is formatted as it would be in the server, then discarded
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                report["profiles"][profile] = asyncio.run(benchmark_profile(profile, directory, args))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare keras model.predict against the compiled inference function
+
+Reports the one-off tracing cost of the compiled path and steady-state
+latency of both paths for each batch size, as JSON.
+
+Usage:
+    python -m tools.inference_benchmark --batch-sizes 1 8 32 --iterations 50
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config import settings
+from models.ml_model import FraudDetectionModel
+
+
+def time_calls(fn, inputs: np.ndarray, iterations: int) -> dict:
+    """Latency percentiles in milliseconds over repeated calls"""
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(inputs)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "mean_ms": round(float(np.mean(samples)), 3),
+        "images_per_s": round(len(inputs) * 1000 / float(np.mean(samples)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.MODEL_PATH, help="Path to the Keras model")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    model = FraudDetectionModel(args.model, compiled_inference=False, backend="keras")
+    width, height = settings.IMAGE_SIZE
+    rng = np.random.default_rng(0)
+
+    def predict(inputs):
+        return model.backend.model.predict(inputs, batch_size=len(inputs), verbose=0)
+
+    # Tracing cost is paid once per process on the first compiled call
+    model.backend.compile()
+    started = time.perf_counter()
+    model.forward(np.zeros((1, height, width, 3), dtype=np.float32))
+    report = {"trace_ms": round((time.perf_counter() - started) * 1000, 3), "batch_sizes": {}}
+
+    for batch_size in args.batch_sizes:
+        inputs = rng.random((batch_size, height, width, 3), dtype=np.float32)
+        predict(inputs)
+        model.forward(inputs)
+
+        keras_predict = time_calls(predict, inputs, args.iterations)
+        compiled = time_calls(model.forward, inputs, args.iterations)
+        report["batch_sizes"][batch_size] = {
+            "keras_predict": keras_predict,
+            "compiled": compiled,
+            "speedup": round(keras_predict["mean_ms"] / compiled["mean_ms"], 2),
+            "max_abs_diff": float(np.abs(predict(inputs) - model.forward(inputs)).max()),
+        }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Maintain content-addressed upload storage
+
+migrate  Move uploads saved before content addressing (flat uuid4 names in
+         UPLOAD_DIR) to digest-named, sharded keys, rewriting each claim's
+         image list and counting blob references. Safe to re-run.
+gc       Delete blobs no claim references any more (after the grace period)
+         together with their derivatives, including blobs left behind by
+         uploads whose claim was never saved.
+
+Usage:
+    python -m tools.manage_storage migrate --dry-run
+    python -m tools.manage_storage migrate --delete-originals
+    python -m tools.manage_storage gc
+"""
+import argparse
+import asyncio
+import os
+
+from sqlalchemy import select
+
+from models import database
+from models.database import Claim, init_db
+from utils.image_derivatives import remove_derivatives
+from utils.prediction_cache import image_digest
+from utils.storage import acquire_blobs, blob_key, collect_garbage, get_storage, is_blob_key
+
+
+async def migrate(dry_run: bool, delete_originals: bool):
+    storage = get_storage()
+    migrated = {}
+    missing = set()
+    claims_updated = 0
+
+    async with database.async_session_maker() as db:
+        result = await db.execute(select(Claim).where(Claim.images.is_not(None)))
+        for claim in result.scalars().all():
+            keys = claim.images
+            new_keys, acquired = [], []
+            for key in keys:
+                if is_blob_key(key):
+                    new_keys.append(key)
+                    continue
+                if key not in migrated:
+                    try:
+                        data = await asyncio.to_thread(storage.read, key)
+                    except FileNotFoundError:
+                        missing.add(key)
+                        new_keys.append(key)
+                        continue
+                    extension = os.path.splitext(key)[1].lstrip(".").lower()
+                    migrated[key] = (blob_key(image_digest(data), extension), len(data))
+                    if not dry_run:
+                        await asyncio.to_thread(storage.put, migrated[key][0], data)
+                new_key, size = migrated[key]
+                new_keys.append(new_key)
+                acquired.append((new_key, size))
+
+            if new_keys != keys:
+                claims_updated += 1
+                if not dry_run:
+                    claim.images = new_keys
+                    await acquire_blobs(db, [k for k, _ in acquired], [size for _, size in acquired])
+                    await db.commit()
+
+    unique = {new_key for new_key, _ in migrated.values()}
+    print(f"{'Would migrate' if dry_run else 'Migrated'} {len(migrated)} uploads "
+          f"into {len(unique)} blobs across {claims_updated} claims")
+    if missing:
+        print(f"⚠️  {len(missing)} referenced uploads are missing and were left unchanged")
+
+    if delete_originals and not dry_run:
+        for key in migrated:
+            storage.delete(key)
+        print(f"Deleted {len(migrated)} original files")
+
+
+async def gc(grace_seconds):
+    async with database.async_session_maker() as db:
+        deleted = await collect_garbage(db, get_storage(), grace_seconds, on_delete=remove_derivatives)
+    print(f"Deleted {deleted} unreferenced blobs")
+
+
+async def run(args):
+    await init_db()
+    if args.command == "migrate":
+        await migrate(args.dry_run, args.delete_originals)
+    else:
+        await gc(args.grace_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = commands.add_parser("migrate", help="Move legacy uploads to content-addressed keys")
+    migrate_parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    migrate_parser.add_argument("--delete-originals", action="store_true", help="Remove the legacy files once migrated")
+    gc_parser = commands.add_parser("gc", help="Delete unreferenced blobs and their derivatives")
+    gc_parser.add_argument("--grace-seconds", type=int, help="Override BLOB_GC_GRACE_SECONDS")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Check that the fast preprocessing path matches the reference path
+
+Runs every image through both preprocess paths and compares the input
+tensors and the model outputs (fraud_risk, damage_severity and
+confidence_score). Exits non-zero if any image is out of tolerance.
+
+Usage:
+    python -m tools.preprocess_parity --images ./uploads
+    python -m tools.preprocess_parity --synthetic 20 --tolerance 0.02
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from models.ml_model import FraudDetectionModel
+from tools.synthetic import load_images, synthetic_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Directory of sample claim images")
+    parser.add_argument("--synthetic", type=int, default=10, help="Synthetic images to use when --images is not given")
+    parser.add_argument("--model", help="Model artifact (defaults to the one for MODEL_BACKEND)")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Max allowed confidence_score difference")
+    args = parser.parse_args()
+
+    images = load_images(args.images) if args.images else synthetic_images(args.synthetic)
+    if not images:
+        parser.error("no images to compare")
+    model = FraudDetectionModel(args.model)
+
+    report = {"images": len(images), "tolerance": args.tolerance, "mismatches": [], "timings_ms": {}}
+    pixel_diffs, score_diffs = [], []
+    timings = {"reference": 0.0, "fast": 0.0}
+
+    for name, image_data in images.items():
+        started = time.perf_counter()
+        reference = model.preprocess_image(image_data, fast=False)
+        timings["reference"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        fast = model.preprocess_image(image_data, fast=True)
+        timings["fast"] += time.perf_counter() - started
+
+        pixel_diffs.append(float(np.abs(reference - fast).mean()))
+
+        expected = model._build_result(model.forward(reference)[0])
+        actual = model._build_result(model.forward(fast)[0])
+        score_diff = abs(expected["confidence_score"] - actual["confidence_score"])
+        score_diffs.append(score_diff)
+
+        if (
+            score_diff > args.tolerance
+            or expected["fraud_risk"] != actual["fraud_risk"]
+            or expected["damage_severity"] != actual["damage_severity"]
+        ):
+            report["mismatches"].append({
+                "image": name,
+                "reference": {k: expected[k] for k in ("fraud_risk", "damage_severity", "confidence_score")},
+                "fast": {k: actual[k] for k in ("fraud_risk", "damage_severity", "confidence_score")},
+            })
+
+    report["mean_abs_pixel_diff"] = round(float(np.mean(pixel_diffs)), 6)
+    report["max_confidence_diff"] = round(float(np.max(score_diffs)), 6)
+    report["timings_ms"] = {
+        path: round(total * 1000 / len(images), 3) for path, total in timings.items()
+    }
+
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["mismatches"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Build a post-training-quantized model and report accuracy parity
+
+Converts MODEL_PATH to a float16, dynamic-range int8 or calibrated int8
+TFLite artifact, then runs the sample images through both the float
+Keras model and the quantized model and reports how often fraud_risk,
+damage_severity and confidence_score agree. Exits non-zero when label
+agreement falls below --min-agreement.
+
+Serve the result with MODEL_QUANTIZATION=<mode>.
+
+Usage:
+    python -m tools.quantize_model --mode dynamic --images ./samples
+    python -m tools.quantize_model --mode int8 --images ./samples --calibration-samples 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from config import settings
+from models.backends import TFLiteBackend, quantized_model_path
+from models.ml_model import FraudDetectionModel
+from tools.convert_model import convert
+from tools.synthetic import load_images
+
+
+def summary(result: dict) -> dict:
+    return {k: result[k] for k in ("fraud_risk", "damage_severity", "confidence_score")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["float16", "dynamic", "int8"], required=True)
+    parser.add_argument("--images", required=True, help="Directory of sample claim images for calibration and evaluation")
+    parser.add_argument("--calibration-samples", type=int, default=100, help="Images used to calibrate int8 ranges")
+    parser.add_argument("--output", help="Where to write the quantized model")
+    parser.add_argument("--confidence-tolerance", type=float, default=0.05)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    output = args.output or quantized_model_path(args.mode)
+    images = load_images(args.images)
+    if not images:
+        parser.error(f"no images found in {args.images}")
+
+    reference = FraudDetectionModel(settings.MODEL_PATH, backend="keras")
+    inputs = {name: reference.preprocess_image(image_data) for name, image_data in images.items()}
+
+    def representative_dataset():
+        for array in list(inputs.values())[:args.calibration_samples]:
+            yield [array]
+
+    started = time.perf_counter()
+    size = convert(reference.backend, output, args.mode, representative_dataset)
+    convert_s = time.perf_counter() - started
+    quantized = TFLiteBackend(output)
+
+    expected, actual = [], []
+    timings = {"float": 0.0, "quantized": 0.0}
+    for array in inputs.values():
+        started = time.perf_counter()
+        expected.append(reference.forward(array)[0])
+        timings["float"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        actual.append(quantized.forward(array)[0])
+        timings["quantized"] += time.perf_counter() - started
+
+    expected = reference._build_results(np.stack(expected))
+    actual = reference._build_results(np.stack(actual))
+    confidence_diffs = np.array([
+        abs(e["confidence_score"] - a["confidence_score"]) for e, a in zip(expected, actual)
+    ])
+
+    def agreement(field: str) -> float:
+        return round(sum(e[field] == a[field] for e, a in zip(expected, actual)) / len(expected), 4)
+
+    report = {
+        "mode": args.mode,
+        "output": output,
+        "images": len(images),
+        "calibration_samples": min(args.calibration_samples, len(images)) if args.mode == "int8" else 0,
+        "convert_s": round(convert_s, 2),
+        "size_bytes": {"float": os.path.getsize(settings.MODEL_PATH), "quantized": size},
+        "latency_ms_per_image": {
+            path: round(total * 1000 / len(images), 3) for path, total in timings.items()
+        },
+        "agreement": {
+            "fraud_risk": agreement("fraud_risk"),
+            "damage_severity": agreement("damage_severity"),
+            "confidence_score_within_tolerance": round(float((confidence_diffs <= args.confidence_tolerance).mean()), 4),
+        },
+        "confidence_score_diff": {
+            "mean": round(float(confidence_diffs.mean()), 6),
+            "max": round(float(confidence_diffs.max()), 6),
+        },
+        "disagreements": [
+            {"image": name, "float": summary(e), "quantized": summary(a)}
+            for name, e, a in zip(inputs, expected, actual)
+            if e["fraud_risk"] != a["fraud_risk"] or e["damage_severity"] != a["damage_severity"]
+        ],
+    }
+
+    print(json.dumps(report, indent=2))
+    passed = min(report["agreement"]["fraud_risk"], report["agreement"]["damage_severity"]) >= args.min_agreement
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Check that claim routes load relationships without N+1 queries
+
+Seeds a scratch SQLite database with claims that each have an AI
+analysis and comments, calls the claim route handlers directly and
+counts the SQL statements each one issues. Exits non-zero if any route
+exceeds its allowance, however many rows it returns. Prints JSON.
+
+Usage:
+    python -m tools.query_count --claims 50 --comments 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import uuid
+
+import orjson
+from sqlalchemy import event
+
+from config import settings
+
+# Per-route statement allowance
+MAX_QUERIES = {
+    "list_claims": 2,
+    "get_claim": 2,
+    "create_claim": 5,  # INSERT, the two stats upserts and the reload
+}
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+async def seed(claims: int, comments: int):
+    from models import database
+    from models.database import AIAnalysisResult, Claim, Comment, DamageType, FraudRisk, User, UserRole
+
+    user = User(id=str(uuid.uuid4()), name="Fleet", email=f"{uuid.uuid4()}@example.com",
+                hashed_password="x", role=UserRole.OWNER)
+    async with database.async_session_maker() as session:
+        session.add(user)
+        for i in range(claims):
+            claim_id = str(uuid.uuid4())
+            session.add(Claim(
+                id=claim_id, claim_number=f"CLM-{i:06d}", claimant_id=user.id, claimant_name="Fleet",
+                vehicle_make="Toyota", vehicle_model="Corolla", vehicle_year=2020,
+                incident_date="2024-01-01", location="Lagos", description="Rear bumper",
+                images=[], policy_number="P-1", policy_type="comprehensive",
+            ))
+            session.add(AIAnalysisResult(
+                id=str(uuid.uuid4()), claim_id=claim_id, damage_severity=DamageType.MINOR, fraud_risk=FraudRisk.LOW,
+                confidence_score=0.9, estimated_cost=500.0,
+            ))
+            for j in range(comments):
+                session.add(Comment(id=str(uuid.uuid4()), claim_id=claim_id, author="agent", content=f"Note {j}"))
+        await session.commit()
+    return user
+
+
+async def measure(claims: int, comments: int) -> dict:
+    from models import database
+    from routes import claims as claim_routes
+
+    await database.init_db()
+    user = await seed(claims, comments)
+    counter = QueryCounter(database.engine)
+    report = {}
+
+    async def count(name, call):
+        async with database.async_session_maker() as session:
+            counter.count = 0
+            response = await call(session)
+            report[name] = {"queries": counter.count, "max": MAX_QUERIES[name]}
+            return response
+
+    page = await count("list_claims", lambda db: claim_routes.list_claims(
+        status=None, limit=claims, offset=0, cursor=None, current_user=user, db=db))
+    page = orjson.loads(page.body)
+    report["list_claims"]["rows"] = len(page)
+
+    await count("get_claim", lambda db: claim_routes.get_claim(
+        claim_id=page[0]["id"], current_user=user, db=db))
+
+    async def create(db):
+        await claim_routes.create_claim(
+            claimant_name="Fleet", vehicle_make="Toyota", vehicle_model="Corolla", vehicle_year=2020,
+            vehicle_vin=None, incident_date="2024-01-01", location="Lagos", description="Dent",
+            policy_number="P-1", policy_type="comprehensive", images=[], current_user=user, db=db,
+        )
+    await count("create_claim", create)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=50, help="Claims on the listed page")
+    parser.add_argument("--comments", type=int, default=3, help="Comments per claim")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(directory, 'query_count.db')}"
+        report = asyncio.run(measure(args.claims, args.comments))
+
+    print(json.dumps(report, indent=2))
+    failed = [name for name, result in report.items() if result["queries"] > result["max"]]
+    if failed:
+        print(f"❌ Too many queries: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
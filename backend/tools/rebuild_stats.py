@@ -0,0 +1,32 @@
+"""
+Recompute the claim statistics summary table from scratch
+
+Claim and analysis writes keep `claim_stats` up to date incrementally,
+and it is backfilled automatically on the first start after it was
+added. Run this to repair it after editing claims outside the API.
+
+Usage:
+    python -m tools.rebuild_stats
+"""
+import argparse
+import asyncio
+
+from models import database
+from models.database import init_db
+from utils.claim_stats import rebuild_claim_stats
+
+
+async def run():
+    await init_db()
+    async with database.async_session_maker() as session:
+        counted = await rebuild_claim_stats(session)
+    print(f"📊 Rebuilt claim statistics from {counted} claims")
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
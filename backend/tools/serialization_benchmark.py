@@ -0,0 +1,139 @@
+"""
+Measure list_claims response serialization, before and after direct mapping
+
+Builds a page of claims in memory, each with an AI analysis, images and
+comments, and times turning it into a response body two ways:
+
+  legacy  json.loads of the images text, nested Pydantic models built
+          field by field, then what FastAPI does with a response_model:
+          dump, validate again, serialize, json.dumps
+  direct  rows mapped straight to dicts and encoded by ORJSONResponse
+
+Checks both produce the same JSON. Prints JSON.
+
+Usage:
+    python -m tools.serialization_benchmark --page-size 50 --iterations 500
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from models.database import AIAnalysisResult, Claim, ClaimStatus, Comment, DamageType, FraudRisk
+from routes.claims import claim_response_data
+from schemas.ai_schemas import AIAnalysisResponse, VerificationChecks
+from schemas.claim_schemas import ClaimImage, ClaimResponse, CommentResponse, VehicleInfo
+from utils.image_derivatives import image_url, image_urls
+
+
+def make_page(page_size: int, images: int, comments: int) -> List[Claim]:
+    created = datetime(2024, 1, 1, 9, 30)
+    page = []
+    for i in range(page_size):
+        claim_id = str(uuid.uuid4())
+        page.append(Claim(
+            id=claim_id, claim_number=f"CLM-20240101-{i:08d}", claimant_id="fleet", claimant_name="Fleet",
+            vehicle_make="Toyota", vehicle_model="Corolla", vehicle_year=2020, vehicle_vin="JT2BF22K1W0123456",
+            incident_date="2024-01-01", location="Lagos", description="Rear bumper and tail light",
+            images=[f"{uuid.uuid4().hex}.jpg" for _ in range(images)],
+            status=ClaimStatus.PENDING, damage_type=DamageType.MODERATE,
+            policy_number="P-1", policy_type="comprehensive",
+            created_at=created - timedelta(minutes=i), updated_at=created,
+            ai_analysis=AIAnalysisResult(
+                id=str(uuid.uuid4()), claim_id=claim_id, damage_severity=DamageType.MODERATE,
+                fraud_risk=FraudRisk.LOW, confidence_score=0.87, is_real_image=True,
+                gps_match=True, time_match=True, vin_match=False, estimated_cost=1250.0,
+            ),
+            comments=[
+                Comment(id=str(uuid.uuid4()), claim_id=claim_id, author="agent",
+                        content=f"Note {j}", timestamp=created + timedelta(hours=j))
+                for j in range(comments)
+            ],
+        ))
+    return page
+
+
+def legacy_convert(claim: Claim, images_text: str) -> ClaimResponse:
+    """convert_claim_to_response before direct mapping, with images stored as JSON text"""
+    ai_analysis = claim.ai_analysis
+    return ClaimResponse(
+        id=claim.id,
+        claim_number=claim.claim_number,
+        claimant_id=claim.claimant_id,
+        claimant_name=claim.claimant_name,
+        vehicle_info=VehicleInfo(make=claim.vehicle_make, model=claim.vehicle_model,
+                                 year=claim.vehicle_year, vin=claim.vehicle_vin),
+        incident_date=claim.incident_date,
+        location=claim.location,
+        description=claim.description,
+        images=[image_url(key) for key in json.loads(images_text)],
+        image_derivatives=[ClaimImage(**image_urls(key)) for key in json.loads(images_text)],
+        status=claim.status,
+        damage_type=claim.damage_type,
+        analysis_status=claim.analysis_status,
+        ai_analysis=AIAnalysisResponse(
+            damage_severity=ai_analysis.damage_severity,
+            fraud_risk=ai_analysis.fraud_risk,
+            confidence_score=ai_analysis.confidence_score,
+            is_real_image=ai_analysis.is_real_image,
+            verification_checks=VerificationChecks(gps_match=ai_analysis.gps_match,
+                                                   time_match=ai_analysis.time_match,
+                                                   vin_match=ai_analysis.vin_match),
+            estimated_cost=ai_analysis.estimated_cost,
+        ),
+        policy_number=claim.policy_number,
+        policy_type=claim.policy_type,
+        created_at=claim.created_at,
+        updated_at=claim.updated_at,
+        comments=[CommentResponse.model_validate(comment) for comment in claim.comments],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=50, help="Claims per page")
+    parser.add_argument("--images", type=int, default=3, help="Images per claim")
+    parser.add_argument("--comments", type=int, default=2, help="Comments per claim")
+    parser.add_argument("--iterations", type=int, default=500, help="Pages serialized per path")
+    args = parser.parse_args()
+
+    page = make_page(args.page_size, args.images, args.comments)
+    images_text = [json.dumps(claim.images) for claim in page]
+    response_adapter = TypeAdapter(List[ClaimResponse])
+
+    def legacy() -> bytes:
+        models = [legacy_convert(claim, text) for claim, text in zip(page, images_text)]
+        # FastAPI's serialize_response: dump, re-validate against response_model, serialize
+        validated = response_adapter.validate_python([model.model_dump() for model in models])
+        return JSONResponse(response_adapter.dump_python(validated, mode="json")).body
+
+    def direct() -> bytes:
+        return ORJSONResponse([claim_response_data(claim) for claim in page]).body
+
+    paths = {"legacy": legacy, "direct": direct}
+    report = {"page_size": args.page_size, "iterations": args.iterations, "paths": {}}
+    for name, path in paths.items():
+        path()  # warm up
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            body = path()
+        elapsed = time.perf_counter() - started
+        report["paths"][name] = {
+            "pages_per_second": round(args.iterations / elapsed, 1),
+            "ms_per_page": round(elapsed / args.iterations * 1000, 3),
+            "bytes": len(body),
+        }
+
+    report["speedup"] = round(report["paths"]["legacy"]["ms_per_page"] / report["paths"]["direct"]["ms_per_page"], 2)
+    report["identical_json"] = json.loads(legacy()) == orjson.loads(direct())
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Measure peak memory of each way of sending an image for analysis
+
+Streams a synthetic payload through the request-body readers in 64KB
+chunks (as ASGI delivers it) and records the peak Python heap with
+tracemalloc. The legacy base64 form path is reproduced for comparison:
+the whole body is buffered, turned into a form string, split on
+"base64," and decoded in one go. Prints JSON.
+
+Usage:
+    python -m tools.upload_memory --size-mb 10
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from utils.image_processor import collect_image_stream, decode_base64_image, decode_base64_stream
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def _chunks(payload: bytes):
+    for start in range(0, len(payload), CHUNK_SIZE):
+        yield payload[start:start + CHUNK_SIZE]
+
+
+async def _buffer(payload: bytes) -> bytes:
+    """What a form parser does: hold the whole field before handing it over"""
+    return b"".join([chunk async for chunk in _chunks(payload)])
+
+
+def legacy_decode_base64_image(base64_string: str) -> bytes:
+    """decode_base64_image before incremental decoding"""
+    if "base64," in base64_string:
+        base64_string = base64_string.split("base64,")[1]
+    return base64.b64decode(base64_string)
+
+
+async def base64_form_legacy(encoded: bytes, raw: bytes) -> int:
+    text = (await _buffer(encoded)).decode("ascii")
+    return len(legacy_decode_base64_image(text))
+
+
+async def base64_form(encoded: bytes, raw: bytes) -> int:
+    text = (await _buffer(encoded)).decode("ascii")
+    return len(decode_base64_image(text))
+
+
+async def base64_stream(encoded: bytes, raw: bytes) -> int:
+    return (await decode_base64_stream(_chunks(encoded))).size
+
+
+async def raw_body(encoded: bytes, raw: bytes) -> int:
+    return (await collect_image_stream(_chunks(raw))).size
+
+
+PATHS = {
+    "base64_form_legacy": base64_form_legacy,
+    "base64_form": base64_form,
+    "base64_stream": base64_stream,
+    "raw_body": raw_body,
+}
+
+
+def measure(path, encoded: bytes, raw: bytes) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = asyncio.run(path(encoded, raw))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert size == len(raw)
+    return {
+        "peak_mb": round(peak / 1024 / 1024, 2),
+        "peak_vs_image": round(peak / len(raw), 2),
+        "ms": round(elapsed * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=9.5, help="Image payload size (must fit MAX_UPLOAD_SIZE)")
+    parser.add_argument("--paths", nargs="+", choices=list(PATHS), default=list(PATHS))
+    args = parser.parse_args()
+
+    raw = np.random.default_rng(0).bytes(int(args.size_mb * 1024 * 1024))
+    encoded = b"data:image/jpeg;base64," + base64.b64encode(raw)
+
+    report = {
+        "image_mb": round(len(raw) / 1024 / 1024, 2),
+        "base64_mb": round(len(encoded) / 1024 / 1024, 2),
+        "paths": {name: measure(PATHS[name], encoded, raw) for name in args.paths},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
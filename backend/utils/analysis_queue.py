@@ -0,0 +1,337 @@
+import asyncio
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import database
+from models.database import AIAnalysisResult, AnalysisJob, AnalysisStatus, Claim
+from models.ml_model import NoValidImagesError, combine_results
+from schemas.ai_schemas import AIAnalysisResponse
+from schemas.claim_schemas import ClaimAnalysisStatus
+from utils.claim_stats import record_analysis
+from utils.decode_admission import decode_admission
+from utils.image_processor import IngestedUpload
+from utils.model_loader import get_inference_executor, get_prediction_cache, model_loader
+from utils.prediction_cache import image_digest
+from utils.storage import get_storage
+
+
+# Analysis states after which a claim's job never runs again
+FINISHED_STATUSES = (AnalysisStatus.COMPLETED, AnalysisStatus.FAILED)
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Failures a retry cannot fix: no decodable image, a missing file or a client error"""
+    if isinstance(error, HTTPException):
+        return error.status_code < 500
+    return isinstance(error, (NoValidImagesError, FileNotFoundError))
+
+
+def _claimable(now: datetime):
+    """Jobs waiting to run, or analyzing under a lease that has run out"""
+    stale = now - timedelta(seconds=settings.ANALYSIS_LEASE_SECONDS)
+    return or_(
+        AnalysisJob.status == AnalysisStatus.PENDING_ANALYSIS,
+        and_(AnalysisJob.status == AnalysisStatus.ANALYZING, AnalysisJob.updated_at < stale),
+    )
+
+
+def _read_uploads(keys: List[str]) -> List[IngestedUpload]:
+    """Reload a claim's stored images (retries and restarted jobs)"""
+    storage = get_storage()
+    uploads = []
+    for key in keys:
+        data = storage.read(key)
+        uploads.append(IngestedUpload(key=key, digest=image_digest(data), size=len(data), data=data))
+    return uploads
+
+
+async def analyze_uploads(uploads: List[IngestedUpload]) -> Dict[str, Any]:
+    """Run all of a claim's images through the model as one batch and combine the results"""
+    executor = get_inference_executor()
+    results = await get_prediction_cache().get_or_predict_many(
+        [upload.data for upload in uploads],
+        decode_admission.guarded_batch(executor.predict_batch),
+        digests=[upload.digest for upload in uploads],
+    )
+    return combine_results([
+        {"image": upload.key, "digest": upload.digest, **result}
+        for upload, result in zip(uploads, results)
+    ])
+
+
+def analysis_response_data(ai_analysis: Optional[AIAnalysisResult]) -> Optional[Dict[str, Any]]:
+    """Map an AIAnalysisResult row straight to the AIAnalysisResponse JSON shape"""
+    if ai_analysis is None:
+        return None
+    return {
+        "damage_severity": ai_analysis.damage_severity,
+        "fraud_risk": ai_analysis.fraud_risk,
+        "confidence_score": ai_analysis.confidence_score,
+        "is_real_image": ai_analysis.is_real_image,
+        "verification_checks": {
+            "gps_match": ai_analysis.gps_match,
+            "time_match": ai_analysis.time_match,
+            "vin_match": ai_analysis.vin_match,
+        },
+        "estimated_cost": ai_analysis.estimated_cost,
+    }
+
+
+def analysis_response(ai_analysis: Optional[AIAnalysisResult]) -> Optional[AIAnalysisResponse]:
+    """Convert an AIAnalysisResult row to its response schema"""
+    data = analysis_response_data(ai_analysis)
+    return AIAnalysisResponse(**data) if data is not None else None
+
+
+async def get_analysis_status(db: AsyncSession, claim: Claim) -> ClaimAnalysisStatus:
+    """Current analysis state of a claim, with the result once it is ready"""
+    job = await db.get(AnalysisJob, claim.id)
+    ai_analysis = None
+    if claim.analysis_status == AnalysisStatus.COMPLETED:
+        result = await db.execute(
+            select(AIAnalysisResult).where(AIAnalysisResult.claim_id == claim.id)
+        )
+        ai_analysis = result.scalar_one_or_none()
+    return ClaimAnalysisStatus(
+        claim_id=claim.id,
+        analysis_status=claim.analysis_status,
+        attempts=job.attempts if job else 0,
+        error=job.last_error if job else None,
+        ai_analysis=analysis_response(ai_analysis),
+    )
+
+
+async def read_analysis_status(claim_id: str) -> Optional[ClaimAnalysisStatus]:
+    """get_analysis_status in a short-lived session; None once the claim is gone"""
+    async with database.async_session_maker() as session:
+        claim = await session.get(Claim, claim_id)
+        return await get_analysis_status(session, claim) if claim is not None else None
+
+
+class AnalysisQueue:
+    """
+    Background queue that runs AI analysis for newly created claims
+
+    Jobs are rows in the `analysis_jobs` table, so queued and interrupted
+    work is picked up again on restart. A fixed number of workers drain the
+    queue; failed attempts are retried with exponential backoff before the
+    claim is marked failed. Workers claim a job with a conditional update,
+    so with several server processes each job runs in only one of them.
+    Status changes are pushed to subscribers (the SSE endpoint) as they
+    happen.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+    ):
+        self.workers = max(1, workers or settings.ANALYSIS_WORKERS)
+        self.max_attempts = max(1, max_attempts or settings.ANALYSIS_MAX_ATTEMPTS)
+        self.retry_backoff = settings.ANALYSIS_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._uploads: Dict[str, List[IngestedUpload]] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+
+    async def start(self):
+        """Requeue unfinished jobs from the database and start the workers"""
+        now = datetime.utcnow()
+        async with database.async_session_maker() as session:
+            result = await session.execute(
+                select(AnalysisJob.claim_id, AnalysisJob.status, AnalysisJob.updated_at)
+                .where(AnalysisJob.status.not_in(FINISHED_STATUSES))
+                .order_by(AnalysisJob.created_at)
+            )
+            jobs = result.all()
+        loop = asyncio.get_running_loop()
+        for claim_id, job_status, updated_at in jobs:
+            # Another process may still be analyzing it; look again once its lease runs out
+            remaining = 0.0
+            if job_status == AnalysisStatus.ANALYZING and updated_at is not None:
+                remaining = settings.ANALYSIS_LEASE_SECONDS - (now - updated_at).total_seconds()
+            if remaining > 0:
+                loop.call_later(remaining, self._queue.put_nowait, claim_id)
+            else:
+                self._queue.put_nowait(claim_id)
+        if jobs:
+            print(f"🔁 Resuming AI analysis for {len(jobs)} claim(s)")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; unfinished jobs stay in the database for the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, claim_id: str, uploads: Optional[List[IngestedUpload]] = None):
+        """
+        Queue a claim whose AnalysisJob row has been committed
+
+        Passing the uploads already in memory saves re-reading them from
+        disk on the first attempt.
+        """
+        if uploads:
+            self._uploads[claim_id] = uploads
+        self._queue.put_nowait(claim_id)
+
+    def subscribe(self, claim_id: str) -> asyncio.Queue:
+        """Receive ClaimAnalysisStatus updates for a claim"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers[claim_id].add(queue)
+        return queue
+
+    def unsubscribe(self, claim_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(claim_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[claim_id]
+
+    def _publish(self, status: ClaimAnalysisStatus):
+        for queue in self._subscribers.get(status.claim_id, ()):
+            queue.put_nowait(status)
+
+    async def _worker(self):
+        while True:
+            claim_id = await self._queue.get()
+            self._running += 1
+            try:
+                await self._process(claim_id)
+            except Exception as e:
+                print(f"Warning: AI analysis job for claim {claim_id} crashed: {str(e)}")
+            finally:
+                self._running -= 1
+                self._queue.task_done()
+
+    async def _process(self, claim_id: str):
+        # Jobs queued during startup wait for the model rather than burning attempts
+        await model_loader.wait_ready()
+
+        # Claim the job; only one worker process can move it out of its claimable state
+        now = datetime.utcnow()
+        async with database.async_session_maker() as session:
+            claimed = await session.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.claim_id == claim_id, _claimable(now))
+                .values(status=AnalysisStatus.ANALYZING, attempts=AnalysisJob.attempts + 1, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            claim = await session.get(Claim, claim_id) if claimed.rowcount == 1 else None
+            if claim is None:
+                await session.rollback()
+                self._uploads.pop(claim_id, None)
+                return
+            claim.analysis_status = AnalysisStatus.ANALYZING
+            attempts = await session.scalar(select(AnalysisJob.attempts).where(AnalysisJob.claim_id == claim_id))
+            keys = claim.images or []
+            await session.commit()
+        self._publish(ClaimAnalysisStatus(
+            claim_id=claim_id, analysis_status=AnalysisStatus.ANALYZING, attempts=attempts
+        ))
+
+        try:
+            uploads = self._uploads.pop(claim_id, None)
+            if uploads is None:
+                uploads = await asyncio.to_thread(_read_uploads, keys)
+            result = await analyze_uploads(uploads)
+        except Exception as e:
+            await self._record_failure(claim_id, attempts, str(getattr(e, "detail", None) or e), _is_permanent(e))
+            return
+
+        # Save AI analysis result
+        try:
+            async with database.async_session_maker() as session:
+                job = await session.get(AnalysisJob, claim_id)
+                claim = await session.get(Claim, claim_id)
+                if job is None or claim is None:
+                    return  # Claim was deleted while it was being analyzed
+                ai_analysis = AIAnalysisResult(
+                    id=str(uuid.uuid4()),
+                    claim_id=claim_id,
+                    damage_severity=result["damage_severity"],
+                    fraud_risk=result["fraud_risk"],
+                    confidence_score=result["confidence_score"],
+                    is_real_image=result["is_real_image"],
+                    gps_match=result["verification_checks"]["gps_match"],
+                    time_match=result["verification_checks"]["time_match"],
+                    vin_match=result["verification_checks"]["vin_match"],
+                    estimated_cost=result["estimated_cost"],
+                    raw_prediction=result["raw_prediction"]
+                )
+                session.add(ai_analysis)
+                await record_analysis(session, claim, ai_analysis.fraud_risk, ai_analysis.estimated_cost)
+                claim.damage_type = result["damage_severity"]
+                claim.analysis_status = AnalysisStatus.COMPLETED
+                job.status = AnalysisStatus.COMPLETED
+                job.last_error = None
+                await session.commit()
+        except Exception as e:
+            await self._record_failure(claim_id, attempts, f"Could not save the analysis: {str(e)}")
+            return
+
+        self._completed += 1
+        self._publish(ClaimAnalysisStatus(
+            claim_id=claim_id,
+            analysis_status=AnalysisStatus.COMPLETED,
+            attempts=attempts,
+            ai_analysis=analysis_response(ai_analysis),
+        ))
+
+    async def _record_failure(self, claim_id: str, attempts: int, error: str, permanent: bool = False):
+        """Schedule a retry, or mark the claim failed once attempts run out or retrying cannot help"""
+        retry = not permanent and attempts < self.max_attempts
+        status = AnalysisStatus.PENDING_ANALYSIS if retry else AnalysisStatus.FAILED
+
+        async with database.async_session_maker() as session:
+            job = await session.get(AnalysisJob, claim_id)
+            claim = await session.get(Claim, claim_id)
+            if job is None or claim is None:
+                return
+            job.status = status
+            job.last_error = error
+            claim.analysis_status = status
+            await session.commit()
+
+        if retry:
+            self._retried += 1
+            delay = self.retry_backoff * 2 ** (attempts - 1)
+            asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, claim_id)
+            print(f"Warning: AI analysis failed for claim {claim_id} (attempt {attempts}), retrying in {delay}s: {error}")
+        else:
+            self._failed += 1
+            print(f"❌ AI analysis failed for claim {claim_id} after {attempts} attempts: {error}")
+
+        self._publish(ClaimAnalysisStatus(
+            claim_id=claim_id, analysis_status=status, attempts=attempts, error=error
+        ))
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and job outcomes for /health"""
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": self._running,
+            "completed": self._completed,
+            "failed": self._failed,
+            "retried": self._retried,
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+        }
+
+
+analysis_queue = AnalysisQueue()
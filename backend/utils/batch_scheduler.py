@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from config import settings
+
+
+class BatchScheduler:
+    """
+    Dynamic micro-batching in front of the fraud detection model
+
+    Single-image requests are queued and grouped into one forward pass of up
+    to `max_batch_size` images, waiting at most `max_wait_ms` for a batch to
+    fill. Each caller awaits its own result. Batches are handed to an async
+    `predict_batch` (the inference executor), so several can be in flight.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[List[bytes]], Awaitable[List[Dict[str, Any]]]],
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+    ):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, max_batch_size or settings.BATCH_MAX_SIZE)
+        self.max_wait_ms = settings.BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+
+        self._pending: Deque[Tuple[bytes, asyncio.Future, float]] = deque()
+        self._has_items = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+        # Stats
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._batches = 0
+        self._batched_items = 0
+        self._max_queue_depth = 0
+        self._total_wait_ms = 0.0
+        self._batch_sizes: Dict[int, int] = {}
+
+    async def start(self):
+        """Start the background batching loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching loop and fail any requests still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        while self._pending:
+            _, future, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(RuntimeError("Batch scheduler stopped"))
+        self._has_items.clear()
+
+    async def submit(self, image_data: bytes) -> Dict[str, Any]:
+        """Queue an image for prediction and wait for its result"""
+        if self._task is None:
+            raise RuntimeError("Batch scheduler not running")
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((image_data, future, time.perf_counter()))
+        self._submitted += 1
+        self._max_queue_depth = max(self._max_queue_depth, len(self._pending))
+
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._batch_full.set()
+
+        return await future
+
+    async def _run(self):
+        """Collect queued requests into batches and dispatch them"""
+        while True:
+            await self._has_items.wait()
+
+            # Give the batch a chance to fill up
+            if len(self._pending) < self.max_batch_size and self.max_wait_ms > 0:
+                self._batch_full.clear()
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.max_wait_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                batch.append(self._pending.popleft())
+            if not self._pending:
+                self._has_items.clear()
+
+            # Skip requests whose callers have gone away
+            batch = [item for item in batch if not item[1].done()]
+            if batch:
+                task = asyncio.create_task(self._dispatch(batch))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[bytes, asyncio.Future, float]]):
+        """Run one forward pass for a batch and hand each caller its result"""
+        started = time.perf_counter()
+        self._batches += 1
+        self._batched_items += len(batch)
+        self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+        for _, _, enqueued in batch:
+            self._total_wait_ms += (started - enqueued) * 1000
+
+        try:
+            results = await self.predict_batch([image_data for image_data, _, _ in batch])
+        except Exception as e:
+            if not isinstance(e, HTTPException):
+                print(f"Error during batched prediction: {str(e)}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            self._failed += len(batch)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if "error" in result:
+                future.set_exception(RuntimeError(result["error"]))
+                self._failed += 1
+            else:
+                future.set_result(result)
+                self._completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and batch size statistics for tuning"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": len(self._pending),
+            "batches_in_flight": len(self._in_flight),
+            "max_queue_depth": self._max_queue_depth,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "batches": self._batches,
+            "avg_batch_size": round(self._batched_items / self._batches, 2) if self._batches else 0.0,
+            "avg_queue_wait_ms": round(self._total_wait_ms / self._batched_items, 3) if self._batched_items else 0.0,
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+        }
@@ -0,0 +1,149 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database import AIAnalysisResult, Claim, ClaimStatsSummary, ClaimStatus, FraudRisk, dialect_insert
+from schemas.claim_schemas import ClaimStats, ClaimStatsDay
+
+
+# Period of the all-time row; sorts after every ISO date
+TOTAL_PERIOD = "total"
+
+STATUS_COLUMNS = {claim_status: f"status_{claim_status.value}" for claim_status in ClaimStatus}
+FRAUD_COLUMNS = {risk: f"fraud_{risk.value}" for risk in FraudRisk}
+COUNTER_COLUMNS = ["claims", *STATUS_COLUMNS.values(), *FRAUD_COLUMNS.values(), "estimated_cost"]
+
+
+async def apply_stats_delta(db: AsyncSession, claimant_id: str, filed_at: datetime, delta: Dict[str, float]):
+    """Add `delta` to a claimant's total and filing-day rows (part of the caller's transaction)"""
+    delta = {column: value for column, value in delta.items() if value}
+    if not delta:
+        return
+    now = datetime.utcnow()
+    for period in (TOTAL_PERIOD, filed_at.date().isoformat()):
+        values = {column: 0 for column in COUNTER_COLUMNS}
+        values.update(delta)
+        statement = dialect_insert(db)(ClaimStatsSummary).values(
+            claimant_id=claimant_id, period=period, updated_at=now, **values
+        )
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[ClaimStatsSummary.claimant_id, ClaimStatsSummary.period],
+            set_={
+                **{column: getattr(ClaimStatsSummary, column) + value for column, value in delta.items()},
+                "updated_at": now,
+            },
+        ))
+
+
+async def _flushed(db: AsyncSession, claim: Claim) -> Claim:
+    # Column defaults (status, created_at) are only filled in on flush
+    if claim.created_at is None or claim.status is None:
+        await db.flush()
+    return claim
+
+
+async def record_claim(db: AsyncSession, claim: Claim, sign: int = 1):
+    """Count a new claim, or with sign=-1 a deleted one"""
+    claim = await _flushed(db, claim)
+    await apply_stats_delta(db, claim.claimant_id, claim.created_at, {
+        "claims": sign,
+        STATUS_COLUMNS[ClaimStatus(claim.status)]: sign,
+    })
+
+
+async def record_status_change(db: AsyncSession, claim: Claim, old_status: ClaimStatus):
+    """Move a claim between status counters"""
+    old_status, new_status = ClaimStatus(old_status), ClaimStatus(claim.status)
+    if old_status == new_status:
+        return
+    await apply_stats_delta(db, claim.claimant_id, claim.created_at, {
+        STATUS_COLUMNS[old_status]: -1,
+        STATUS_COLUMNS[new_status]: 1,
+    })
+
+
+async def record_analysis(db: AsyncSession, claim: Claim, fraud_risk: FraudRisk, estimated_cost: Optional[float], sign: int = 1):
+    """Count a claim's AI analysis result, or with sign=-1 remove it"""
+    await apply_stats_delta(db, claim.claimant_id, claim.created_at, {
+        FRAUD_COLUMNS[FraudRisk(fraud_risk)]: sign,
+        "estimated_cost": sign * (estimated_cost or 0.0),
+    })
+
+
+def _bucket(row: Optional[ClaimStatsSummary]) -> dict:
+    return {
+        "claims": row.claims if row else 0,
+        "by_status": {claim_status.value: getattr(row, column) if row else 0 for claim_status, column in STATUS_COLUMNS.items()},
+        "by_fraud_risk": {risk.value: getattr(row, column) if row else 0 for risk, column in FRAUD_COLUMNS.items()},
+        "estimated_cost": round(row.estimated_cost, 2) if row else 0.0,
+    }
+
+
+async def get_claim_stats(db: AsyncSession, claimant_id: str, days: int, today: Optional[date] = None) -> ClaimStats:
+    """A claimant's totals plus the last `days` days, read from the summary rows only"""
+    today = today or datetime.utcnow().date()
+    first_day = today - timedelta(days=days - 1)
+
+    total = await db.get(ClaimStatsSummary, (claimant_id, TOTAL_PERIOD))
+    result = await db.execute(
+        select(ClaimStatsSummary).where(
+            ClaimStatsSummary.claimant_id == claimant_id,
+            ClaimStatsSummary.period >= first_day.isoformat(),
+            ClaimStatsSummary.period <= today.isoformat(),
+        )
+    )
+    by_day = {row.period: row for row in result.scalars().all()}
+
+    daily = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        daily.append(ClaimStatsDay(day=day, **_bucket(by_day.get(day.isoformat()))))
+    return ClaimStats(daily=daily, **_bucket(total))
+
+
+async def rebuild_claim_stats(db: AsyncSession) -> int:
+    """
+    Recompute every summary row from the claims and analysis tables
+
+    For backfilling existing data and repairing drift; normal writes keep
+    the rows up to date incrementally. Returns the number of claims counted.
+    """
+    totals: Dict[tuple, Dict[str, float]] = defaultdict(lambda: {column: 0 for column in COUNTER_COLUMNS})
+    counted = 0
+    rows = await db.stream(
+        select(
+            Claim.claimant_id, Claim.created_at, Claim.status,
+            AIAnalysisResult.fraud_risk, AIAnalysisResult.estimated_cost,
+        ).outerjoin(AIAnalysisResult, AIAnalysisResult.claim_id == Claim.id)
+    )
+    async for claimant_id, created_at, claim_status, fraud_risk, estimated_cost in rows:
+        counted += 1
+        created_at = created_at or datetime.utcnow()
+        for period in (TOTAL_PERIOD, created_at.date().isoformat()):
+            counters = totals[(claimant_id, period)]
+            counters["claims"] += 1
+            counters[STATUS_COLUMNS[ClaimStatus(claim_status or ClaimStatus.PENDING)]] += 1
+            if fraud_risk is not None:
+                counters[FRAUD_COLUMNS[FraudRisk(fraud_risk)]] += 1
+                counters["estimated_cost"] += estimated_cost or 0.0
+
+    await db.execute(delete(ClaimStatsSummary))
+    now = datetime.utcnow()
+    db.add_all([
+        ClaimStatsSummary(claimant_id=claimant_id, period=period, updated_at=now, **counters)
+        for (claimant_id, period), counters in totals.items()
+    ])
+    await db.commit()
+    return counted
+
+
+async def ensure_claim_stats(db: AsyncSession):
+    """Backfill the summary table on first start after it was introduced"""
+    if await db.scalar(select(ClaimStatsSummary.claimant_id).limit(1)) is not None:
+        return
+    if await db.scalar(select(Claim.id).limit(1)) is not None:
+        counted = await rebuild_claim_stats(db)
+        print(f"📊 Built claim statistics from {counted} existing claims")
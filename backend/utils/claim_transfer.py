@@ -0,0 +1,356 @@
+import codecs
+import csv
+import io
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import orjson
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import database
+from models.database import AIAnalysisResult, AnalysisStatus, Claim, ClaimStatus, DamageType, FraudRisk, User
+from schemas.claim_schemas import ClaimImportError, ClaimImportResult, ClaimImportRow
+from utils.claim_stats import FRAUD_COLUMNS, STATUS_COLUMNS, apply_stats_delta
+
+
+# Flat record layout shared by export and import
+CLAIM_COLUMNS = [
+    "id", "claim_number", "claimant_id", "claimant_name",
+    "vehicle_make", "vehicle_model", "vehicle_year", "vehicle_vin",
+    "incident_date", "location", "description", "images",
+    "status", "damage_type", "analysis_status", "policy_number", "policy_type",
+    "created_at", "updated_at",
+]
+ANALYSIS_COLUMNS = [
+    "damage_severity", "fraud_risk", "confidence_score", "is_real_image",
+    "gps_match", "time_match", "vin_match", "estimated_cost",
+]
+EXPORT_COLUMNS = CLAIM_COLUMNS + [f"ai_{column}" for column in ANALYSIS_COLUMNS]
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_query():
+    """Claims joined with their AI analysis, one flat row per claim in EXPORT_COLUMNS order"""
+    return select(
+        *(getattr(Claim, column) for column in CLAIM_COLUMNS),
+        *(getattr(AIAnalysisResult, column).label(f"ai_{column}") for column in ANALYSIS_COLUMNS),
+    ).outerjoin(AIAnalysisResult, AIAnalysisResult.claim_id == Claim.id)
+
+
+async def _partitions(query) -> AsyncIterator[Sequence[Any]]:
+    # Own session: the stream outlives the request's dependencies
+    async with database.async_session_maker() as session:
+        result = await session.stream(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield rows
+
+
+async def export_ndjson(query) -> AsyncIterator[bytes]:
+    """Stream rows of `export_query()` as NDJSON, one chunk per fetched batch"""
+    async for rows in _partitions(query):
+        yield b"".join(
+            orjson.dumps(dict(zip(EXPORT_COLUMNS, row)), option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return orjson.dumps(value).decode()
+    return value
+
+
+async def export_csv(query) -> AsyncIterator[bytes]:
+    """Stream rows of `export_query()` as CSV with a header row, one chunk per fetched batch"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode()
+
+    async for rows in _partitions(query):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """
+    Split a UTF-8 byte stream (BOM allowed) into lines, keeping their line endings
+
+    Only the partial line is buffered. A line over IMPORT_MAX_RECORD_SIZE
+    bytes is dropped as it arrives and yielded as None.
+    """
+    limit = settings.IMPORT_MAX_RECORD_SIZE
+    parts: List[bytes] = []
+    size = 0
+    overlong = False
+    first = True
+
+    def finish(tail: bytes) -> Optional[str]:
+        nonlocal parts, size, overlong, first
+        line = None if overlong or size + len(tail) > limit else b"".join(parts) + tail
+        parts, size, overlong = [], 0, False
+        if line is None:
+            first = False
+            return None
+        if first:
+            line = line[len(codecs.BOM_UTF8):] if line.startswith(codecs.BOM_UTF8) else line
+            first = False
+        try:
+            return line.decode("utf-8")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Import file is not valid UTF-8")
+
+    async for chunk in chunks:
+        # "\n" never occurs inside a multi-byte UTF-8 sequence, so bytes split safely
+        *complete, rest = chunk.split(b"\n")
+        for piece in complete:
+            yield finish(piece + b"\n")
+        if rest and not overlong:
+            size += len(rest)
+            if size > limit:
+                parts, overlong = [], True
+            else:
+                parts.append(rest)
+    if parts or overlong:
+        yield finish(b"")
+
+
+# Parsed records: (row number, record or the reason it could not be read)
+ImportRecord = Tuple[int, Union[Dict[str, Any], str]]
+
+
+def _too_long() -> str:
+    return f"Record exceeds {settings.IMPORT_MAX_RECORD_SIZE} bytes"
+
+
+async def read_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRecord]:
+    """Parse an NDJSON stream into records numbered by line; blank lines are skipped"""
+    line_number = 0
+    async for line in _lines(chunks):
+        line_number += 1
+        if line is None:
+            yield line_number, _too_long()
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield line_number, f"Invalid JSON: {str(e)}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, "Expected a JSON object"
+            continue
+        yield line_number, record
+
+
+async def read_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRecord]:
+    """Parse a CSV stream with a header row into records numbered from the first data row"""
+    header: Optional[List[str]] = None
+    record_number = 0
+    parts: List[str] = []
+    size = 0
+    quotes = 0
+    overlong = False
+    async for line in _lines(chunks):
+        if line is None:
+            # Its quotes are unknown; treat the record as ending with it
+            overlong, quotes = True, 0
+        else:
+            quotes += line.count('"')
+            size += len(line)
+            overlong = overlong or size > settings.IMPORT_MAX_RECORD_SIZE
+            if not overlong:
+                parts.append(line)
+            # A quoted field may span lines; the record ends once quotes balance
+            if quotes % 2:
+                continue
+        text = "".join(parts)
+        record_overlong = overlong
+        parts, size, quotes, overlong = [], 0, 0, False
+
+        if header is None:
+            if record_overlong:
+                raise HTTPException(status_code=400, detail=f"CSV header exceeds {settings.IMPORT_MAX_RECORD_SIZE} bytes")
+            if text.strip():
+                header = [name.strip() for name in next(csv.reader([text]))]
+            continue
+        if record_overlong:
+            record_number += 1
+            yield record_number, _too_long()
+            continue
+        if not text.strip():
+            continue
+        record_number += 1
+        values = next(csv.reader([text]))
+        if len(values) != len(header):
+            yield record_number, f"Expected {len(header)} fields, got {len(values)}"
+            continue
+        yield record_number, {name: value if value != "" else None for name, value in zip(header, values)}
+    if parts or overlong:
+        yield record_number + 1, _too_long() if overlong else "Unterminated quoted field"
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+class ClaimImporter:
+    """
+    Inserts parsed records in batched transactions, collecting per-row errors
+
+    Rows go in IMPORT_BATCH_SIZE at a time, each batch in one transaction
+    together with its claim statistics. If a batch fails to commit, its
+    rows are retried one by one so only the offending rows are reported.
+    """
+
+    def __init__(self, db: AsyncSession, user: User, new_claim_number: Callable[[], str]):
+        self.db = db
+        self.user = user
+        self.new_claim_number = new_claim_number
+        self.is_admin = user.role.value == "admin"
+        self.result = ClaimImportResult()
+        self._known_users: Set[str] = {user.id}
+
+    def _fail(self, row: int, error: str):
+        self.result.failed += 1
+        if len(self.result.errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            self.result.errors.append(ClaimImportError(row=row, error=error))
+
+    async def run(self, records: AsyncIterator[ImportRecord]) -> ClaimImportResult:
+        batch: List[Tuple[int, ClaimImportRow]] = []
+        async for row, record in records:
+            if isinstance(record, str):
+                self._fail(row, record)
+                continue
+            try:
+                batch.append((row, ClaimImportRow.model_validate(record)))
+            except ValidationError as e:
+                self._fail(row, _validation_message(e))
+                continue
+            if len(batch) >= settings.IMPORT_BATCH_SIZE:
+                await self._insert(batch)
+                batch = []
+        if batch:
+            await self._insert(batch)
+        return self.result
+
+    async def _insert(self, batch: List[Tuple[int, ClaimImportRow]]):
+        try:
+            failures = await self._insert_batch(batch)
+        except Exception:
+            await self.db.rollback()
+            failures = []
+            for item in batch:
+                try:
+                    failures += await self._insert_batch([item])
+                except Exception as e:
+                    await self.db.rollback()
+                    failures.append((item[0], f"Could not insert claim: {str(e)}"))
+        self.result.imported += len(batch) - len(failures)
+        for row, error in failures:
+            self._fail(row, error)
+
+    async def _claimants(self, batch: List[Tuple[int, ClaimImportRow]]) -> Set[str]:
+        """Claimant ids of the batch that exist (admins may import for other users)"""
+        wanted = {item.claimant_id for _, item in batch if self.is_admin and item.claimant_id} - self._known_users
+        if wanted:
+            result = await self.db.execute(select(User.id).where(User.id.in_(wanted)))
+            self._known_users.update(result.scalars().all())
+        return self._known_users
+
+    async def _insert_batch(self, batch: List[Tuple[int, ClaimImportRow]]) -> List[Tuple[int, str]]:
+        """Insert and commit the acceptable rows of a batch; returns the rejected (row, error) pairs"""
+        known_users = await self._claimants(batch)
+        numbers = [item.claim_number for _, item in batch if item.claim_number]
+        taken = set()
+        if numbers:
+            result = await self.db.execute(select(Claim.claim_number).where(Claim.claim_number.in_(numbers)))
+            taken = set(result.scalars().all())
+
+        now = datetime.utcnow()
+        deltas: Dict[Tuple[str, Any], Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        failures = []
+        for row, item in batch:
+            claimant_id = item.claimant_id if self.is_admin and item.claimant_id else self.user.id
+            if claimant_id not in known_users:
+                failures.append((row, f"Unknown claimant_id '{claimant_id}'"))
+                continue
+            if item.claim_number in taken:
+                failures.append((row, f"Claim number '{item.claim_number}' already exists"))
+                continue
+            has_analysis = item.ai_fraud_risk is not None
+            if has_analysis and (item.ai_damage_severity is None or item.ai_confidence_score is None):
+                failures.append((row, "ai_fraud_risk requires ai_damage_severity and ai_confidence_score"))
+                continue
+
+            claim_number = item.claim_number or self.new_claim_number()
+            taken.add(claim_number)
+            created_at = item.created_at or now
+            claim_status = ClaimStatus(item.status.value)
+            claim = Claim(
+                id=str(uuid.uuid4()),
+                claim_number=claim_number,
+                claimant_id=claimant_id,
+                claimant_name=item.claimant_name,
+                vehicle_make=item.vehicle_make,
+                vehicle_model=item.vehicle_model,
+                vehicle_year=item.vehicle_year,
+                vehicle_vin=item.vehicle_vin,
+                incident_date=item.incident_date,
+                location=item.location,
+                description=item.description,
+                images=[],
+                status=claim_status,
+                damage_type=DamageType(item.damage_type.value) if item.damage_type else None,
+                analysis_status=AnalysisStatus.COMPLETED if has_analysis else None,
+                policy_number=item.policy_number,
+                policy_type=item.policy_type,
+                created_at=created_at,
+                updated_at=now,
+            )
+            self.db.add(claim)
+
+            delta = deltas[(claimant_id, created_at.date())]
+            delta["claims"] += 1
+            delta[STATUS_COLUMNS[claim_status]] += 1
+            if has_analysis:
+                fraud_risk = FraudRisk(item.ai_fraud_risk.value)
+                self.db.add(AIAnalysisResult(
+                    id=str(uuid.uuid4()),
+                    claim_id=claim.id,
+                    damage_severity=DamageType(item.ai_damage_severity.value),
+                    fraud_risk=fraud_risk,
+                    confidence_score=item.ai_confidence_score,
+                    is_real_image=item.ai_is_real_image if item.ai_is_real_image is not None else True,
+                    gps_match=item.ai_gps_match if item.ai_gps_match is not None else True,
+                    time_match=item.ai_time_match if item.ai_time_match is not None else True,
+                    vin_match=item.ai_vin_match if item.ai_vin_match is not None else True,
+                    estimated_cost=item.ai_estimated_cost or 0.0,
+                ))
+                delta[FRAUD_COLUMNS[fraud_risk]] += 1
+                delta["estimated_cost"] += item.ai_estimated_cost or 0.0
+
+        for (claimant_id, day), delta in deltas.items():
+            await apply_stats_delta(self.db, claimant_id, datetime.combine(day, datetime.min.time()), delta)
+        await self.db.commit()
+        return failures
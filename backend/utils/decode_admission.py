@@ -0,0 +1,160 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from config import settings
+from utils.image_sniffer import ImageHeader, sniff_image
+
+
+def estimate_decode_bytes(header: ImageHeader, target: Optional[Tuple[int, int]] = None) -> int:
+    """
+    Approximate peak memory of decoding an image down to `target`
+
+    JPEGs on the fast path are decoded at 1/2, 1/4 or 1/8 scale by draft
+    mode, straight to RGB. Other formats decode at full size, possibly as
+    RGBA, plus an RGB copy.
+    """
+    target = target or settings.IMAGE_SIZE
+    width, height = header.width, header.height
+    if header.format == "jpeg":
+        if settings.FAST_PREPROCESS:
+            scale = 1
+            while scale < 8 and width // (scale * 2) >= target[0] and height // (scale * 2) >= target[1]:
+                scale *= 2
+            width, height = width // scale, height // scale
+        return width * height * 3
+    return width * height * 7
+
+
+def estimate_image_bytes(image_data: bytes, target: Optional[Tuple[int, int]] = None) -> int:
+    """Decode memory estimate of an image, from its header alone"""
+    return estimate_decode_bytes(sniff_image(image_data), target)
+
+
+class DecodeAdmission:
+    """
+    Admission control for image decodes, by estimated memory
+
+    Each request reserves its estimated decode memory before the image is
+    decoded. Requests run while the total stays within the budget (a
+    single request over the budget runs alone); the rest wait in FIFO
+    order. Once `max_waiting` requests are queued, or one has waited
+    `wait_timeout` seconds, new work gets a 503 with Retry-After.
+    """
+
+    def __init__(
+        self,
+        budget_mb: Optional[int] = None,
+        max_waiting: Optional[int] = None,
+        wait_timeout: Optional[float] = None,
+    ):
+        self.budget = (budget_mb or settings.DECODE_MEMORY_BUDGET_MB) * 1024 * 1024
+        self.max_waiting = settings.DECODE_MAX_WAITING if max_waiting is None else max_waiting
+        self.wait_timeout = wait_timeout or settings.DECODE_WAIT_TIMEOUT
+
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+        self._used = 0
+        self._in_flight = 0
+        self._peak_used = 0
+        self._admitted = 0
+        self._queued = 0
+        self._rejected = 0
+
+    def _fits(self, nbytes: int) -> bool:
+        return self._in_flight == 0 or self._used + nbytes <= self.budget
+
+    def _grant(self, nbytes: int):
+        self._used += nbytes
+        self._in_flight += 1
+        self._admitted += 1
+        self._peak_used = max(self._peak_used, self._used)
+
+    def _wake(self):
+        """Admit waiters in order while they fit"""
+        while self._waiters:
+            nbytes, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._fits(nbytes):
+                break
+            self._waiters.popleft()
+            self._grant(nbytes)
+            future.set_result(None)
+
+    def _reject(self, detail: str):
+        self._rejected += 1
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+
+    async def acquire(self, nbytes: int):
+        """Wait until `nbytes` of decode memory is available"""
+        if not self._waiters and self._fits(nbytes):
+            self._grant(nbytes)
+            return
+        if len(self._waiters) >= self.max_waiting:
+            self._reject("Too many images being processed, please retry shortly")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (nbytes, future)
+        self._waiters.append(entry)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(future, self.wait_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Admitted just as we gave up
+                self.release(nbytes)
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                self._wake()
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("Timed out waiting to process image, please retry shortly")
+            raise
+
+    def release(self, nbytes: int):
+        self._used -= nbytes
+        self._in_flight -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int):
+        """Hold `nbytes` of decode memory for the duration of the block"""
+        await self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+    def guarded(self, predict: Callable[[bytes], Awaitable[Any]]) -> Callable[[bytes], Awaitable[Any]]:
+        """Wrap an async predict function so it runs within the budget (cache hits never call it)"""
+        async def run(image_data: bytes):
+            async with self.reserve(estimate_image_bytes(image_data)):
+                return await predict(image_data)
+        return run
+
+    def guarded_batch(self, predict_batch: Callable[[List[bytes]], Awaitable[Any]]) -> Callable[[List[bytes]], Awaitable[Any]]:
+        """Batch variant of `guarded`, reserving the summed estimate of the images decoded"""
+        async def run(images_data: List[bytes]):
+            async with self.reserve(sum(estimate_image_bytes(image_data) for image_data in images_data)):
+                return await predict_batch(images_data)
+        return run
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget usage and queue depth for /health"""
+        return {
+            "budget_mb": round(self.budget / 1024 / 1024, 1),
+            "used_mb": round(self._used / 1024 / 1024, 1),
+            "peak_used_mb": round(self._peak_used / 1024 / 1024, 1),
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "max_waiting": self.max_waiting,
+            "admitted": self._admitted,
+            "queued": self._queued,
+            "rejected": self._rejected,
+        }
+
+
+decode_admission = DecodeAdmission()
@@ -0,0 +1,186 @@
+import asyncio
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from PIL import Image, ImageOps
+from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from config import settings
+from utils.decode_admission import decode_admission, estimate_image_bytes
+from utils.storage import get_storage, sharded
+
+
+# Derivative names never change content, so browsers and CDNs may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def derivative_name(key: str, variant: str) -> str:
+    """Path of a rendition of an uploaded image, fanned out like the originals"""
+    stem = os.path.splitext(os.path.basename(key))[0]
+    return sharded(f"{stem}.{variant}.webp")
+
+
+def image_url(key: str) -> str:
+    """Public URL of an uploaded image"""
+    return get_storage().url(key)
+
+
+def image_urls(key: str) -> Dict[str, str]:
+    """Public URLs of an uploaded image and its derivatives, in the ClaimImage shape"""
+    return {
+        "url": image_url(key),
+        "thumbnail_url": f"/derivatives/{derivative_name(key, 'thumb')}",
+        "medium_url": f"/derivatives/{derivative_name(key, 'medium')}",
+    }
+
+
+def generate_derivatives(key: str, image_data: Optional[bytes] = None) -> List[str]:
+    """
+    Render every configured WebP size of an uploaded image
+
+    The image is decoded once, at reduced resolution for JPEGs, and each
+    size is downscaled from the previous (larger) one. Files are written
+    atomically so a half-written derivative is never served.
+    """
+    if image_data is None:
+        image_data = get_storage().read(key)
+
+    largest = max(settings.DERIVATIVE_SIZES.values())
+    image = Image.open(io.BytesIO(image_data))
+    if image.format == "JPEG":
+        image.draft("RGB", (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    written = []
+    for variant, size in sorted(settings.DERIVATIVE_SIZES.items(), key=lambda item: -item[1]):
+        image.thumbnail((size, size), Image.LANCZOS, reducing_gap=3.0)
+        output = os.path.join(settings.DERIVATIVE_DIR, derivative_name(key, variant))
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        temp = f"{output}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(temp, "WEBP", quality=settings.DERIVATIVE_QUALITY, method=4)
+        os.replace(temp, output)
+        written.append(output)
+    return written
+
+
+def remove_derivatives(key: str):
+    """Delete every rendition of an upload (when its blob is garbage-collected)"""
+    for variant in settings.DERIVATIVE_SIZES:
+        try:
+            os.remove(os.path.join(settings.DERIVATIVE_DIR, derivative_name(key, variant)))
+        except FileNotFoundError:
+            pass
+
+
+def find_original(name: str) -> Optional[str]:
+    """Storage key of the upload a derivative path was rendered from, if it exists"""
+    filename = os.path.basename(name)
+    parts = filename.split(".")
+    if len(parts) != 3 or parts[1] not in settings.DERIVATIVE_SIZES or parts[2] != "webp":
+        return None
+    if name != sharded(filename):
+        return None
+
+    # Content-addressed originals, then flat ones saved before sharding
+    storage = get_storage()
+    for extension in settings.ALLOWED_EXTENSIONS:
+        for key in (sharded(f"{parts[0]}.{extension}"), f"{parts[0]}.{extension}"):
+            if storage.exists(key):
+                return key
+    return None
+
+
+class DerivativeGenerator:
+    """
+    Renders claim photo derivatives in the background
+
+    Uploads are handed over with their bytes still in memory, so nothing is
+    re-read from disk; rendering runs on a small thread pool off the
+    request path. Every render, including on-demand ones for missing
+    derivatives, counts against the decode memory budget, and concurrent
+    renders of the same upload share one.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, workers or settings.DERIVATIVE_WORKERS)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="derivatives")
+        self._tasks: Set[asyncio.Future] = set()
+        self._rendering: Dict[str, asyncio.Future] = {}
+        self._generated = 0
+        self._failed = 0
+
+    def schedule(self, key: str, image_data: Optional[bytes] = None):
+        """Start rendering the derivatives of one upload"""
+        task = asyncio.create_task(self.render(key, image_data))
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+
+    async def render(self, key: str, image_data: Optional[bytes] = None) -> List[str]:
+        """Render one upload's derivatives, joining a render of the same key already running"""
+        pending = self._rendering.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render(key, image_data))
+            self._rendering[key] = pending
+            pending.add_done_callback(lambda _: self._rendering.pop(key, None))
+        # A caller that goes away does not cancel the render for the others
+        return await asyncio.shield(pending)
+
+    async def _render(self, key: str, image_data: Optional[bytes]):
+        # Estimated from the header alone; the original is only read once admitted
+        header = image_data
+        if header is None:
+            header = await asyncio.to_thread(get_storage().read_head, key, settings.IMAGE_HEADER_MAX_BYTES)
+        largest = max(settings.DERIVATIVE_SIZES.values())
+        loop = asyncio.get_running_loop()
+        async with decode_admission.reserve(estimate_image_bytes(header, (largest, largest))):
+            return await loop.run_in_executor(self._pool, generate_derivatives, key, image_data)
+
+    def _finished(self, task: asyncio.Future):
+        self._tasks.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self._failed += 1
+            print(f"Warning: Derivative generation failed: {str(error)}")
+        else:
+            self._generated += 1
+
+    def shutdown(self):
+        """Finish queued renders and stop the pool"""
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Background rendering counters for /health"""
+        return {
+            "workers": self.workers,
+            "pending": len(self._tasks),
+            "generated": self._generated,
+            "failed": self._failed,
+        }
+
+
+class DerivativeStaticFiles(StaticFiles):
+    """Serves derivatives with immutable cache headers, rendering any that are missing"""
+
+    async def get_response(self, path: str, scope) -> Any:
+        try:
+            response = await super().get_response(path, scope)
+        except StarletteHTTPException as e:
+            key = await asyncio.to_thread(find_original, path) if e.status_code == 404 else None
+            if key is None:
+                raise
+            await derivative_generator.render(key)
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+derivative_generator = DerivativeGenerator()
@@ -1,12 +1,18 @@
 from PIL import Image
+import asyncio
+import binascii
+import hashlib
 import io
-from typing import Optional
-from fastapi import UploadFile, HTTPException
-import base64
+from typing import AsyncIterator, NamedTuple, Optional, Tuple
+from fastapi import UploadFile, HTTPException, Request
 import os
-import uuid
 
 from config import settings
+from utils.image_sniffer import ImageHeader, inspect_image
+from utils.storage import blob_key, get_storage
+
+# Backstop for any decode that bypasses the header check
+Image.MAX_IMAGE_PIXELS = settings.MAX_IMAGE_PIXELS
 
 
 def validate_image_file(file: UploadFile) -> bool:
@@ -35,42 +41,287 @@ def validate_image_size(file_size: int) -> bool:
     return True
 
 
+def _validate_upload(file: UploadFile):
+    """Validate an upload's name and declared size (the stored extension comes from its header)"""
+    # Validate file
+    validate_image_file(file)
+    
+    # Reject early when the client declared the size up front
+    if getattr(file, "size", None) is not None:
+        validate_image_size(file.size)
+
+
+def _read_header(head: bytes, chunk: bytes) -> Tuple[Optional[ImageHeader], bytes]:
+    """
+    Add the next chunk to an upload's first bytes and try to read its header
+    
+    `head` stops growing at IMAGE_HEADER_MAX_BYTES, so a header that needs
+    more bytes is judged from what was read instead of rescanning the file.
+    """
+    head += chunk[:settings.IMAGE_HEADER_MAX_BYTES - len(head)]
+    complete = not chunk or len(head) >= settings.IMAGE_HEADER_MAX_BYTES
+    return inspect_image(head, complete=complete), head
+
+
+class SavedUpload(NamedTuple):
+    """Storage key of an upload, its content digest and size in bytes"""
+    key: str
+    digest: str
+    size: int
+
+
+async def store_upload(file: UploadFile) -> SavedUpload:
+    """
+    Stream an upload into content-addressed storage in chunks
+    
+    The size limit is enforced while streaming so oversized files are
+    rejected without being buffered, and the content digest is computed in
+    the same pass. The finished file is moved in under its digest, so an
+    identical upload is kept only once. File I/O runs in a worker thread so
+    the event loop never blocks on disk.
+    """
+    _validate_upload(file)
+    storage = get_storage()
+    temp_path = storage.new_temp_path()
+    
+    # Same digest as prediction_cache.image_digest, so it can key the cache
+    digest = hashlib.blake2b(digest_size=20)
+    size = 0
+    header, head = None, b""
+    out = await asyncio.to_thread(open, temp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+            if header is None:
+                # True format and dimensions from the first bytes, before anything decodes it
+                header, head = _read_header(head, chunk)
+            if not chunk:
+                break
+            size += len(chunk)
+            validate_image_size(size)
+            digest.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        await asyncio.to_thread(out.close)
+        await asyncio.to_thread(os.remove, temp_path)
+        raise
+    await asyncio.to_thread(out.close)
+    
+    key = blob_key(digest.hexdigest(), header.extension)
+    await asyncio.to_thread(storage.put_file, key, temp_path)
+    return SavedUpload(key=key, digest=digest.hexdigest(), size=size)
+
+
+class IngestedUpload(NamedTuple):
+    """A stored upload whose bytes are kept in memory for analysis"""
+    key: str
+    digest: str
+    size: int
+    data: bytes
+
+
+async def ingest_upload(file: UploadFile) -> IngestedUpload:
+    """
+    Read an upload once, hash it, store it and keep its bytes
+    
+    Used when the same bytes go on to the model, so the file is never
+    re-read from the request or from storage.
+    """
+    _validate_upload(file)
+    
+    digest = hashlib.blake2b(digest_size=20)
+    chunks = []
+    size = 0
+    header, head = None, b""
+    while True:
+        chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+        if header is None:
+            header, head = _read_header(head, chunk)
+        if not chunk:
+            break
+        size += len(chunk)
+        validate_image_size(size)
+        digest.update(chunk)
+        chunks.append(chunk)
+    data = b"".join(chunks)
+    
+    key = blob_key(digest.hexdigest(), header.extension)
+    await asyncio.to_thread(get_storage().put, key, data)
+    return IngestedUpload(key=key, digest=digest.hexdigest(), size=size, data=data)
+
+
 async def save_upload_file(file: UploadFile) -> str:
-    """Save uploaded file and return file path"""
+    """Save uploaded file and return its storage key"""
     try:
-        # Validate file
-        validate_image_file(file)
-        
-        # Generate unique filename
-        extension = file.filename.split(".")[-1].lower()
-        filename = f"{uuid.uuid4()}.{extension}"
-        file_path = os.path.join(settings.UPLOAD_DIR, filename)
-        
-        # Read and validate size
-        contents = await file.read()
-        validate_image_size(len(contents))
+        return (await store_upload(file)).key
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
+
+
+class StreamedImage(NamedTuple):
+    """Image bytes read from a request stream, with their content digest and size"""
+    data: bytes
+    digest: str
+    size: int
+
+
+class Base64StreamDecoder:
+    """
+    Incremental base64 decoder
+    
+    Encoded chunks are decoded as they arrive through memoryviews, carrying
+    at most three characters between chunks, so the full encoded payload is
+    never held in memory. Anything up to "base64," is skipped (a data URL
+    prefix) and the decoded size limit is enforced as it grows.
+    """
+    
+    _WHITESPACE = b" \t\r\n"
+    _MAX_PREFIX = 256
+    
+    def __init__(self):
+        self._parts = []
+        self._carry = b""
+        self._header = b""
+        self._in_header = True
+        self._digest = hashlib.blake2b(digest_size=20)
+        self.size = 0
+    
+    def feed(self, chunk: bytes):
+        if self._in_header:
+            # Base64 has no commas: buffer up to the first one, then drop
+            # everything through "base64," (e.g. "data:image/jpeg;base64,")
+            chunk = self._header + bytes(chunk)
+            comma = chunk.find(b",")
+            if comma < 0 and len(chunk) <= self._MAX_PREFIX:
+                self._header = chunk
+                return
+            self._skip_prefix(chunk)
+            return
+        self._decode(chunk)
+    
+    def _skip_prefix(self, chunk: bytes):
+        self._in_header = False
+        self._header = b""
+        marker = chunk.find(b"base64,")
+        self._decode(chunk[marker + len(b"base64,"):] if marker >= 0 else chunk)
+    
+    def _decode(self, chunk):
+        if any(c in chunk for c in self._WHITESPACE):
+            chunk = bytes(chunk).translate(None, self._WHITESPACE)
         
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        view = memoryview(chunk)
+        if self._carry:
+            # Complete the quantum left over from the previous chunk
+            needed = 4 - len(self._carry)
+            self._carry += bytes(view[:needed])
+            view = view[needed:]
+            if len(self._carry) < 4:
+                return
+            self._emit(self._carry)
+            self._carry = b""
         
-        return file_path
+        usable = len(view) - len(view) % 4
+        if usable:
+            self._emit(view[:usable])
+        self._carry = bytes(view[usable:])
+    
+    def _emit(self, encoded):
+        decoded = binascii.a2b_base64(encoded)
+        self.size += len(decoded)
+        validate_image_size(self.size)
+        self._digest.update(decoded)
+        self._parts.append(decoded)
     
+    def finish(self) -> StreamedImage:
+        if self._in_header:
+            self._skip_prefix(self._header)
+        if self._carry:
+            raise ValueError("Truncated base64 payload")
+        data = b"".join(self._parts)
+        self._parts = []
+        return StreamedImage(data=data, digest=self._digest.hexdigest(), size=self.size)
+
+
+async def decode_base64_stream(chunks: AsyncIterator[bytes]) -> StreamedImage:
+    """Decode a base64 image from a stream of encoded chunks"""
+    decoder = Base64StreamDecoder()
+    try:
+        async for chunk in chunks:
+            decoder.feed(chunk)
+        image = decoder.finish()
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Invalid base64 image: {str(e)}")
+    if not image.size:
+        raise HTTPException(status_code=400, detail="Empty image")
+    return image
+
+
+async def collect_image_stream(chunks: AsyncIterator[bytes]) -> StreamedImage:
+    """Read raw image bytes from a stream of chunks, hashing them on the way in"""
+    digest = hashlib.blake2b(digest_size=20)
+    parts = []
+    size = 0
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        size += len(chunk)
+        validate_image_size(size)
+        digest.update(chunk)
+        parts.append(chunk)
+    if not size:
+        raise HTTPException(status_code=400, detail="Empty image")
+    
+    # Join a single chunk without copying
+    data = parts[0] if len(parts) == 1 else b"".join(parts)
+    return StreamedImage(data=bytes(data), digest=digest.hexdigest(), size=size)
+
+
+def _check_content_length(request: Request, limit: int):
+    """Reject a body whose declared length is already over the limit"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB"
+        )
+
+
+async def read_image_body(request: Request) -> StreamedImage:
+    """Read an image sent as the raw request body (application/octet-stream or image/*)"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type != "application/octet-stream" and not content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=415,
+            detail="Send the image as the request body with Content-Type application/octet-stream or image/*"
+        )
+    _check_content_length(request, settings.MAX_UPLOAD_SIZE)
+    return await collect_image_stream(request.stream())
+
+
+async def read_base64_body(request: Request) -> StreamedImage:
+    """Decode a base64 image (optionally a data URL) sent as the raw request body"""
+    # Base64 is 4 characters per 3 bytes, plus room for a data URL prefix
+    _check_content_length(request, settings.MAX_UPLOAD_SIZE * 4 // 3 + 1024)
+    return await decode_base64_stream(request.stream())
 
 
 def decode_base64_image(base64_string: str) -> bytes:
     """Decode base64 image string to bytes"""
     try:
-        # Remove data URL prefix if present
-        if "base64," in base64_string:
-            base64_string = base64_string.split("base64,")[1]
-        
-        # Decode base64
-        image_data = base64.b64decode(base64_string)
-        return image_data
+        # Encode and decode in bounded slices instead of copying the whole string
+        decoder = Base64StreamDecoder()
+        step = settings.UPLOAD_CHUNK_SIZE
+        for start in range(0, len(base64_string), step):
+            decoder.feed(base64_string[start:start + step].encode("ascii"))
+        return decoder.finish().data
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid base64 image: {str(e)}")
 
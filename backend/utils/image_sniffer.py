@@ -0,0 +1,187 @@
+import struct
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException
+
+from config import settings
+
+
+class ImageHeader(NamedTuple):
+    """True format, dimensions and frame count of an image, read from its header"""
+    format: str
+    width: int
+    height: int
+    frames: int
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    @property
+    def extension(self) -> str:
+        return FORMAT_EXTENSIONS[self.format]
+
+
+class IncompleteHeader(Exception):
+    """More bytes are needed to read the header"""
+
+
+# Canonical file extension of each format we can sniff
+FORMAT_EXTENSIONS = {"jpeg": "jpg", "png": "png", "webp": "webp"}
+
+# Extensions accepted per format (ALLOWED_EXTENSIONS is keyed by extension)
+_FORMAT_ALIASES = {"jpeg": {"jpg", "jpeg"}, "png": {"png"}, "webp": {"webp"}}
+
+# JPEG start-of-frame markers (all but DHT, JPG and DAC in C0-CF)
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _sniff_jpeg(data: bytes) -> ImageHeader:
+    offset = 2
+    while True:
+        if offset + 4 > len(data):
+            raise IncompleteHeader()
+        if data[offset] != 0xFF:
+            raise ValueError("Corrupt JPEG marker")
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            # Standalone markers carry no length
+            offset += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            raise ValueError("JPEG has no frame header")
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                raise IncompleteHeader()
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return ImageHeader("jpeg", width, height, 1)
+        (length,) = struct.unpack(">H", data[offset + 2:offset + 4])
+        offset += 2 + length
+
+
+def _sniff_png(data: bytes) -> ImageHeader:
+    if len(data) < 24:
+        raise IncompleteHeader()
+    if data[12:16] != b"IHDR":
+        raise ValueError("PNG does not start with IHDR")
+    width, height = struct.unpack(">II", data[16:24])
+
+    # An animated PNG declares its frame count in acTL, before the first IDAT
+    frames = 1
+    offset = 8
+    while True:
+        if offset + 8 > len(data):
+            raise IncompleteHeader()
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        if chunk_type == b"acTL":
+            if offset + 12 > len(data):
+                raise IncompleteHeader()
+            (frames,) = struct.unpack(">I", data[offset + 8:offset + 12])
+            break
+        if chunk_type in (b"IDAT", b"IEND"):
+            break
+        offset += 12 + length
+    return ImageHeader("png", width, height, frames)
+
+
+def _sniff_webp(data: bytes, complete: bool) -> ImageHeader:
+    if len(data) < 30:
+        raise IncompleteHeader()
+    chunk_type = data[12:16]
+
+    if chunk_type == b"VP8 ":
+        if data[23:26] != b"\x9d\x01\x2a":
+            raise ValueError("Corrupt VP8 frame header")
+        width, height = struct.unpack("<HH", data[26:30])
+        return ImageHeader("webp", width & 0x3FFF, height & 0x3FFF, 1)
+
+    if chunk_type == b"VP8L":
+        if data[20] != 0x2F:
+            raise ValueError("Corrupt VP8L header")
+        bits = int.from_bytes(data[21:25], "little")
+        return ImageHeader("webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, 1)
+
+    if chunk_type == b"VP8X":
+        flags = data[20]
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        frames = 1
+        if flags & 0x02:
+            # Animated: count ANMF chunks by walking chunk headers only
+            frames = 0
+            offset = 30
+            while offset + 8 <= len(data):
+                chunk, length = data[offset:offset + 4], int.from_bytes(data[offset + 4:offset + 8], "little")
+                if chunk == b"ANMF":
+                    frames += 1
+                offset += 8 + length + (length & 1)
+            if not complete and frames < 2:
+                raise IncompleteHeader()
+            frames = max(frames, 1)
+        return ImageHeader("webp", width, height, frames)
+
+    raise ValueError("Unknown WebP bitstream")
+
+
+def sniff_image(data: bytes, complete: bool = True) -> Optional[ImageHeader]:
+    """
+    Read an image's format, dimensions and frame count from its header
+
+    Only magic bytes and header structures are parsed; pixel data is never
+    decoded. With `complete=False`, `data` may be a prefix of the file and
+    None is returned when more bytes are needed.
+    """
+    try:
+        if len(data) < 12:
+            raise IncompleteHeader()
+        if data[:3] == b"\xff\xd8\xff":
+            return _sniff_jpeg(data)
+        if data[:8] == b"\x89PNG\r\n\x1a\n":
+            return _sniff_png(data)
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return _sniff_webp(data, complete)
+    except IncompleteHeader:
+        if not complete:
+            return None
+        raise HTTPException(status_code=400, detail="Invalid image: truncated header")
+    except (ValueError, struct.error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
+
+    raise HTTPException(
+        status_code=415,
+        detail=f"Unsupported image format. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+    )
+
+
+def check_image_header(header: ImageHeader) -> ImageHeader:
+    """Reject disallowed formats and images over the pixel or frame budget before decoding"""
+    if not _FORMAT_ALIASES[header.format] & set(settings.ALLOWED_EXTENSIONS):
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported image format. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+        )
+    if header.width <= 0 or header.height <= 0:
+        raise HTTPException(status_code=400, detail="Invalid image: zero dimensions")
+    if header.pixels > settings.MAX_IMAGE_PIXELS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image too large: {header.width}x{header.height} exceeds {settings.MAX_IMAGE_PIXELS} pixels"
+        )
+    if header.frames > settings.MAX_IMAGE_FRAMES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Animated images are not supported ({header.frames} frames)"
+        )
+    return header
+
+
+def inspect_image(data: bytes, complete: bool = True) -> Optional[ImageHeader]:
+    """Sniff and check an image header; None if a prefix is too short to tell yet"""
+    header = sniff_image(data, complete)
+    if header is None:
+        return None
+    return check_image_header(header)
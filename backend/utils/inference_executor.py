@@ -0,0 +1,136 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from config import settings
+
+
+# Model instance owned by a process-pool worker
+_process_model = None
+
+
+def _init_process_model(model_path: str):
+    """Load the model once in each process-pool worker"""
+    global _process_model
+    from models.ml_model import FraudDetectionModel
+    _process_model = FraudDetectionModel(model_path)
+
+
+def _process_ping() -> bool:
+    return _process_model is not None
+
+
+def _process_predict_fraud(image_data: bytes) -> Dict[str, Any]:
+    return _process_model.predict_fraud(image_data)
+
+
+def _process_predict_batch(images_data: List[bytes]) -> List[Dict[str, Any]]:
+    return _process_model.predict_batch(images_data)
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model inference off the asyncio event loop
+
+    Uses a dedicated thread pool (sharing the loaded model) or a process pool
+    (one model copy per worker). At most `workers` jobs run at once; once
+    `max_pending` images are waiting, new work is rejected with a 503 so a
+    burst of uploads can't pile up behind the model.
+    """
+
+    def __init__(
+        self,
+        model=None,
+        model_path: Optional[str] = None,
+        kind: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self.kind = kind or settings.INFERENCE_EXECUTOR
+        self.workers = max(1, workers or settings.INFERENCE_WORKERS)
+        self.max_pending = max_pending or settings.INFERENCE_MAX_PENDING
+        self.model = model
+
+        if self.kind == "process":
+            # TensorFlow is not fork-safe, so workers are spawned fresh
+            self._pool: Executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_model,
+                initargs=(model_path,),
+            )
+        elif self.kind == "thread":
+            if model is None:
+                raise ValueError("Thread executor requires a loaded model")
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="inference",
+            )
+        else:
+            raise ValueError(f"Unknown inference executor: {self.kind}")
+
+        self._slots = asyncio.Semaphore(self.workers)
+        self._pending = 0
+        self._running = 0
+        self._rejected = 0
+
+    async def run(self, fn, *args, weight: int = 1) -> Any:
+        """Run `fn(*args)` on the pool, counting `weight` images against the backlog"""
+        if self._pending + weight > self.max_pending and self._pending > 0:
+            self._rejected += weight
+            raise HTTPException(
+                status_code=503,
+                detail="Inference queue is full, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self._pending += weight
+        try:
+            async with self._slots:
+                self._running += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(self._pool, fn, *args)
+                finally:
+                    self._running -= 1
+        finally:
+            self._pending -= weight
+
+    async def predict_fraud(self, image_data: bytes) -> Dict[str, Any]:
+        """Predict fraud for one image on the pool"""
+        if self.kind == "process":
+            return await self.run(_process_predict_fraud, image_data)
+        return await self.run(self.model.predict_fraud, image_data)
+
+    async def predict_batch(self, images_data: List[bytes]) -> List[Dict[str, Any]]:
+        """Predict fraud for a batch of images on the pool"""
+        if self.kind == "process":
+            return await self.run(_process_predict_batch, images_data, weight=len(images_data))
+        return await self.run(self.model.predict_batch, images_data, weight=len(images_data))
+
+    async def wait_ready(self):
+        """Start every pool worker and wait for it to finish loading the model"""
+        if self.kind != "process":
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(self._pool, _process_ping) for _ in range(self.workers)
+        ])
+
+    def shutdown(self):
+        """Stop the pool, waiting for running jobs to finish"""
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load on the executor"""
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "running": self._running,
+            "pending_images": self._pending,
+            "max_pending": self.max_pending,
+            "rejected_images": self._rejected,
+        }
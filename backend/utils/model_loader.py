@@ -0,0 +1,169 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+from config import settings
+from utils.batch_scheduler import BatchScheduler
+from utils.inference_executor import InferenceExecutor
+from utils.prediction_cache import PredictionCache
+
+
+class ModelLoader:
+    """
+    Loads the fraud detection model in the background
+
+    The server starts accepting traffic immediately; inference routes get a
+    fast 503 with Retry-After until the model, executor, cache and batch
+    scheduler are all ready. Heavy imports (TensorFlow) happen here, off
+    the startup path.
+    """
+
+    PENDING = "pending"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self):
+        self.phase = self.PENDING
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._started_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.ml_model = None
+        self.inference_executor: Optional[InferenceExecutor] = None
+        self.batch_scheduler: Optional[BatchScheduler] = None
+        self.prediction_cache: Optional[PredictionCache] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == self.READY
+
+    async def start(self):
+        """Begin loading the model without blocking startup"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._load())
+
+    async def wait_ready(self):
+        """Wait for background loading to finish (used by tools and tests)"""
+        if self._task is not None:
+            await self._task
+
+    async def _load(self):
+        self.phase = self.LOADING
+        self._started_at = time.perf_counter()
+        try:
+            from models.backends import default_model_path
+            from models.ml_model import FraudDetectionModel, compute_model_version, prediction_version
+
+            # Load ML model (process-pool workers load their own copy)
+            if settings.USE_MODEL_SERVER:
+                # Client with the same interface; the model lives in the shared server
+                ml_model = await asyncio.to_thread(FraudDetectionModel, backend="remote")
+                await self.install(ml_model, InferenceExecutor(model=ml_model, kind="thread"))
+            elif settings.INFERENCE_EXECUTOR == "process":
+                model_path = default_model_path()
+                inference_executor = InferenceExecutor(model_path=model_path)
+                artifact_version = await asyncio.to_thread(compute_model_version, model_path)
+                model_version = prediction_version(artifact_version, settings.FAST_PREPROCESS)
+                await inference_executor.wait_ready()
+                await self.install(None, inference_executor, model_version)
+            else:
+                ml_model = await asyncio.to_thread(FraudDetectionModel)
+                await self.install(ml_model, InferenceExecutor(model=ml_model))
+
+            self.load_seconds = round(time.perf_counter() - self._started_at, 3)
+            print(
+                f"✅ AI Model loaded in {self.load_seconds}s "
+                f"({self.inference_executor.kind} executor, {self.inference_executor.workers} workers, "
+                f"batches of {self.batch_scheduler.max_batch_size} / {self.batch_scheduler.max_wait_ms} ms)"
+            )
+        except Exception as e:
+            self.load_seconds = round(time.perf_counter() - self._started_at, 3)
+            self.error = str(e)
+            self.phase = self.FAILED
+            print(f"❌ AI Model failed to load: {str(e)}")
+
+    async def install(
+        self,
+        ml_model,
+        inference_executor: InferenceExecutor,
+        model_version: Optional[str] = None,
+        prediction_cache: Optional[PredictionCache] = None,
+    ):
+        """Wire a loaded model into the cache and batch scheduler and mark it ready"""
+        self.ml_model = ml_model
+        self.inference_executor = inference_executor
+
+        # Prediction cache, invalidated whenever the model file changes
+        if prediction_cache is None:
+            prediction_cache = PredictionCache(model_version or ml_model.model_version)
+            await prediction_cache.invalidate_stale()
+        self.prediction_cache = prediction_cache
+
+        # Start inference batching
+        self.batch_scheduler = BatchScheduler(inference_executor.predict_batch)
+        await self.batch_scheduler.start()
+        self.phase = self.READY
+
+    async def stop(self):
+        """Cancel loading if still in progress and release inference resources"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self.batch_scheduler is not None:
+            await self.batch_scheduler.stop()
+        if self.inference_executor is not None:
+            self.inference_executor.shutdown()
+
+    def require_ready(self):
+        """Raise a fast 503 (or 500 if loading failed) unless the model is ready"""
+        if self.phase == self.READY:
+            return
+        if self.phase == self.FAILED:
+            raise HTTPException(status_code=500, detail=f"AI model failed to load: {self.error}")
+        raise HTTPException(
+            status_code=503,
+            detail="AI model is still loading, please retry shortly",
+            headers={"Retry-After": str(settings.MODEL_LOADING_RETRY_AFTER)},
+        )
+
+    def status(self) -> Dict[str, Any]:
+        """Loading phase and timing for /health"""
+        elapsed = None
+        if self.phase == self.LOADING and self._started_at is not None:
+            elapsed = round(time.perf_counter() - self._started_at, 3)
+        return {
+            "phase": self.phase,
+            "load_seconds": self.load_seconds,
+            "loading_for_seconds": elapsed,
+            "error": self.error,
+        }
+
+
+model_loader = ModelLoader()
+
+
+# Accessors used by routes
+def get_ml_model():
+    return model_loader.ml_model
+
+
+def get_inference_executor() -> InferenceExecutor:
+    model_loader.require_ready()
+    return model_loader.inference_executor
+
+
+def get_batch_scheduler() -> BatchScheduler:
+    model_loader.require_ready()
+    return model_loader.batch_scheduler
+
+
+def get_prediction_cache() -> PredictionCache:
+    model_loader.require_ready()
+    return model_loader.prediction_cache
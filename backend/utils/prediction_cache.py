@@ -0,0 +1,161 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, select
+
+from config import settings
+from models import database
+from models.database import PredictionCacheEntry
+
+
+def image_digest(image_data: bytes) -> str:
+    """Content hash used to identify an uploaded image"""
+    return hashlib.blake2b(image_data, digest_size=20).hexdigest()
+
+
+class PredictionCache:
+    """
+    Content-addressed cache of model predictions
+
+    Results are keyed by the image digest and the model version, so a new
+    model never serves stale predictions. A bounded in-memory LRU tier sits
+    in front of an optional persistent tier in the `prediction_cache` table.
+    """
+
+    def __init__(
+        self,
+        model_version: str,
+        max_entries: Optional[int] = None,
+        persistent: Optional[bool] = None,
+    ):
+        self.model_version = model_version
+        self.max_entries = settings.PREDICTION_CACHE_SIZE if max_entries is None else max_entries
+        self.persistent = settings.PREDICTION_CACHE_PERSISTENT if persistent is None else persistent
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._hits = 0
+        self._persistent_hits = 0
+        self._misses = 0
+
+    async def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached prediction by image digest"""
+        result = self._entries.get(digest)
+        if result is not None:
+            self._entries.move_to_end(digest)
+            self._hits += 1
+            return result
+
+        if self.persistent:
+            result = await self._load(digest)
+            if result is not None:
+                self._remember(digest, result)
+                self._persistent_hits += 1
+                return result
+
+        self._misses += 1
+        return None
+
+    async def set(self, digest: str, result: Dict[str, Any]):
+        """Store a prediction for an image digest"""
+        self._remember(digest, result)
+        if self.persistent:
+            await self._store(digest, result)
+
+    async def get_or_predict(
+        self,
+        image_data: bytes,
+        predict: Callable[[bytes], Awaitable[Dict[str, Any]]],
+        digest: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Return the cached prediction for an image, running `predict` on a miss"""
+        digest = digest or image_digest(image_data)
+        result = await self.get(digest)
+        if result is None:
+            result = await predict(image_data)
+            await self.set(digest, result)
+        return result
+
+    async def get_or_predict_many(
+        self,
+        images_data: List[bytes],
+        predict_batch: Callable[[List[bytes]], Awaitable[List[Dict[str, Any]]]],
+        digests: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Batch variant of get_or_predict; only cache misses reach the model"""
+        digests = digests or [image_digest(image_data) for image_data in images_data]
+        results = [await self.get(digest) for digest in digests]
+
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            predicted = await predict_batch([images_data[i] for i in misses])
+            for i, result in zip(misses, predicted):
+                results[i] = result
+                if "error" not in result:
+                    await self.set(digests[i], result)
+
+        return results
+
+    async def invalidate_stale(self):
+        """Drop cached predictions made by any other model version"""
+        self._entries.clear()
+        if not self.persistent:
+            return
+
+        async with database.async_session_maker() as session:
+            await session.execute(
+                delete(PredictionCacheEntry).where(
+                    PredictionCacheEntry.model_version != self.model_version
+                )
+            )
+            await session.commit()
+
+    def _remember(self, digest: str, result: Dict[str, Any]):
+        """Insert into the in-memory LRU tier, evicting the oldest entries"""
+        if self.max_entries <= 0:
+            return
+        self._entries[digest] = result
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _load(self, digest: str) -> Optional[Dict[str, Any]]:
+        try:
+            async with database.async_session_maker() as session:
+                row = await session.execute(
+                    select(PredictionCacheEntry.result).where(
+                        PredictionCacheEntry.image_digest == digest,
+                        PredictionCacheEntry.model_version == self.model_version,
+                    )
+                )
+                result = row.scalar_one_or_none()
+            return result
+        except Exception as e:
+            print(f"Warning: prediction cache lookup failed: {str(e)}")
+            return None
+
+    async def _store(self, digest: str, result: Dict[str, Any]):
+        try:
+            async with database.async_session_maker() as session:
+                await session.merge(PredictionCacheEntry(
+                    image_digest=digest,
+                    model_version=self.model_version,
+                    result=result,
+                ))
+                await session.commit()
+        except Exception as e:
+            print(f"Warning: prediction cache write failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        lookups = self._hits + self._persistent_hits + self._misses
+        return {
+            "model_version": self.model_version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": self.persistent,
+            "hits": self._hits,
+            "persistent_hits": self._persistent_hits,
+            "misses": self._misses,
+            "hit_rate": round((self._hits + self._persistent_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,261 @@
+import os
+import tempfile
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models.database import StoredBlob, dialect_insert
+
+
+def blob_key(digest: str, extension: str) -> str:
+    """Storage key of an upload: its content digest fanned out over a directory tree"""
+    return sharded(f"{digest}.{extension}")
+
+
+def is_blob_key(key: str) -> bool:
+    """Whether a stored image path is already a content-addressed key"""
+    stem, extension = os.path.splitext(os.path.basename(key))
+    return (
+        len(stem) == 40
+        and all(c in "0123456789abcdef" for c in stem)
+        and key == blob_key(stem, extension.lstrip("."))
+    )
+
+
+def sharded(name: str, depth: Optional[int] = None) -> str:
+    """Prefix a file name with `depth` directory levels of two characters each"""
+    depth = settings.STORAGE_FANOUT_DEPTH if depth is None else depth
+    levels = [name[i * 2:i * 2 + 2] for i in range(depth)]
+    return "/".join(levels + [name])
+
+
+class BlobStorage(ABC):
+    """
+    Where uploaded images are kept, addressed by key
+
+    Keys come from `blob_key`, so identical uploads share one blob. The
+    local filesystem is the only implementation today; an object store can
+    implement the same interface.
+    """
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether a blob is stored under `key`"""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> bool:
+        """Store bytes under `key`; returns False if the blob was already stored"""
+
+    @abstractmethod
+    def put_file(self, key: str, source_path: str) -> bool:
+        """Move a complete local file in under `key`; returns False if already stored"""
+
+    @abstractmethod
+    def read(self, key: str) -> bytes:
+        """Contents of a blob"""
+
+    def read_head(self, key: str, size: int) -> bytes:
+        """First `size` bytes of a blob (enough to read an image header)"""
+        return self.read(key)[:size]
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove a blob if present"""
+
+    @abstractmethod
+    def modified_at(self, key: str) -> Optional[float]:
+        """When a blob was last written or deduplicated against (epoch seconds)"""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Public URL of a blob"""
+
+    @abstractmethod
+    def keys(self) -> Iterable[str]:
+        """Every stored key"""
+
+    def new_temp_path(self) -> str:
+        """Local scratch file that an upload is streamed into before `put_file`"""
+        return os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}.part")
+
+
+class LocalBlobStorage(BlobStorage):
+    """Blobs stored as files in a fan-out directory tree under `root`"""
+
+    def __init__(self, root: Optional[str] = None, url_prefix: str = "/uploads"):
+        self.root = root or settings.UPLOAD_DIR
+        self.url_prefix = url_prefix
+        self.temp_dir = os.path.join(self.root, ".tmp")
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+    def _relative(self, key: str) -> str:
+        """Accept keys and legacy paths saved before content addressing (e.g. ./uploads/x.jpg)"""
+        path = os.path.normpath(key)
+        root = os.path.normpath(self.root)
+        if path.startswith(root + os.sep):
+            path = os.path.relpath(path, root)
+        if path.startswith("..") or os.path.isabs(path):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def path(self, key: str) -> str:
+        """Filesystem path of a blob"""
+        return os.path.join(self.root, self._relative(key))
+
+    def new_temp_path(self) -> str:
+        """Scratch file on the same filesystem, so finished uploads move in atomically"""
+        return os.path.join(self.temp_dir, f"{uuid.uuid4()}.part")
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def put(self, key: str, data: bytes) -> bool:
+        if self._touch(key):
+            return False
+        temp = self.new_temp_path()
+        with open(temp, "wb") as f:
+            f.write(data)
+        return self._move_in(key, temp)
+
+    def put_file(self, key: str, source_path: str) -> bool:
+        if self._touch(key):
+            os.remove(source_path)
+            return False
+        return self._move_in(key, source_path)
+
+    def _touch(self, key: str) -> bool:
+        """Refresh an existing blob's mtime so garbage collection leaves it alone"""
+        try:
+            os.utime(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _move_in(self, key: str, source_path: str) -> bool:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source_path, path)
+        return True
+
+    def read(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def read_head(self, key: str, size: int) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read(size)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def modified_at(self, key: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.path(key))
+        except FileNotFoundError:
+            return None
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{self._relative(key).replace(os.sep, '/')}"
+
+    def keys(self) -> Iterable[str]:
+        for directory, subdirectories, files in os.walk(self.root):
+            subdirectories[:] = [d for d in subdirectories if not d.startswith(".")]
+            for name in files:
+                yield os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, "/")
+
+
+# Storage used by the application
+_storage: Optional[BlobStorage] = None
+
+
+def get_storage() -> BlobStorage:
+    global _storage
+    if _storage is None:
+        if settings.STORAGE_BACKEND != "local":
+            raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+        _storage = LocalBlobStorage()
+    return _storage
+
+
+async def acquire_blobs(db: AsyncSession, keys: List[str], sizes: Optional[List[int]] = None):
+    """Count one more reference to each blob (part of the caller's transaction)"""
+    now = datetime.utcnow()
+    sizes = sizes or [None] * len(keys)
+    for key, size in zip(keys, sizes):
+        statement = dialect_insert(db)(StoredBlob).values(
+            key=key, size=size, refcount=1, created_at=now, updated_at=now
+        )
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[StoredBlob.key],
+            set_={"refcount": StoredBlob.refcount + 1, "updated_at": now},
+        ))
+
+
+async def release_blobs(db: AsyncSession, keys: List[str]):
+    """Drop one reference to each blob; unreferenced blobs are left for garbage collection"""
+    now = datetime.utcnow()
+    for key in keys:
+        await db.execute(
+            update(StoredBlob)
+            .where(StoredBlob.key == key)
+            .values(refcount=StoredBlob.refcount - 1, updated_at=now)
+        )
+
+
+async def collect_garbage(
+    db: AsyncSession,
+    storage: BlobStorage,
+    grace_seconds: Optional[int] = None,
+    on_delete=None,
+) -> int:
+    """
+    Delete blobs that no claim references any more
+
+    Blobs released or re-uploaded within the grace period are kept, so an
+    upload that deduplicated against a blob just before its last claim
+    was deleted doesn't lose its file. Stored blobs without a row at all
+    (written by a request that failed before its claim committed) are
+    swept once they are older than the grace period too.
+    """
+    grace_seconds = settings.BLOB_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    result = await db.execute(
+        select(StoredBlob).where(StoredBlob.refcount <= 0, StoredBlob.updated_at < cutoff)
+    )
+
+    deleted = 0
+
+    def remove(key: str):
+        nonlocal deleted
+        storage.delete(key)
+        if on_delete is not None:
+            on_delete(key)
+        deleted += 1
+
+    for blob in result.scalars().all():
+        modified_at = storage.modified_at(blob.key)
+        if modified_at is not None and modified_at > time.time() - grace_seconds:
+            continue
+        remove(blob.key)
+        await db.delete(blob)
+    await db.commit()
+
+    # Orphans: content-addressed files that never got a refcount row
+    known = set((await db.execute(select(StoredBlob.key))).scalars().all())
+    for key in storage.keys():
+        if key in known or not is_blob_key(key):
+            continue
+        modified_at = storage.modified_at(key)
+        if modified_at is None or modified_at > time.time() - grace_seconds:
+            continue
+        remove(key)
+    return deleted
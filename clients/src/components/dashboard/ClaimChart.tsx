@@ -1,9 +1,11 @@
 import React from 'react';
 import { Card } from '@/components/ui/Card';
 import { LineChart, Line, BarChart, Bar, PieChart, Pie, Cell, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, Legend } from 'recharts';
+import type { ClaimStats } from '@/types';
 
 interface ClaimChartProps {
     type: 'line' | 'pie';
+    stats?: ClaimStats | null;
 }
 
 const lineData = [
@@ -22,7 +24,27 @@ const pieData = [
     { name: 'Info Requested', value: 10, color: '#3b82f6' },
 ];
 
-export const ClaimChart: React.FC<ClaimChartProps> = ({ type }) => {
+const statusSlices = [
+    { status: 'approved', name: 'Approved', color: '#22c55e' },
+    { status: 'pending', name: 'Pending', color: '#eab308' },
+    { status: 'rejected', name: 'Rejected', color: '#ef4444' },
+    { status: 'info_requested', name: 'Info Requested', color: '#3b82f6' },
+] as const;
+
+const toLineData = (stats: ClaimStats) =>
+    stats.daily.map((day) => ({
+        month: new Date(`${day.day}T00:00:00`).toLocaleDateString(undefined, { month: 'short', day: 'numeric' }),
+        claims: day.claims,
+    }));
+
+const toPieData = (stats: ClaimStats) =>
+    statusSlices.map(({ status, name, color }) => ({
+        name,
+        value: stats.claims ? Math.round((stats.by_status[status] / stats.claims) * 100) : 0,
+        color,
+    }));
+
+export const ClaimChart: React.FC<ClaimChartProps> = ({ type, stats }) => {
     if (type === 'line') {
         return (
             <Card
@@ -30,7 +52,7 @@ export const ClaimChart: React.FC<ClaimChartProps> = ({ type }) => {
                 className="animate-fade-in"
             >
                 <ResponsiveContainer width="100%" height={300}>
-                    <LineChart data={lineData}>
+                    <LineChart data={stats ? toLineData(stats) : lineData}>
                         <CartesianGrid strokeDasharray="3 3" stroke="#e5e7eb" />
                         <XAxis dataKey="month" stroke="#6b7280" />
                         <YAxis stroke="#6b7280" />
@@ -42,6 +64,8 @@ export const ClaimChart: React.FC<ClaimChartProps> = ({ type }) => {
         );
     }
 
+    const slices: { name: string; value: number; color: string }[] = stats ? toPieData(stats) : pieData;
+
     return (
         <Card
             header={<h3 className="font-semibold text-gray-900">Claim Status Distribution</h3>}
@@ -50,7 +74,7 @@ export const ClaimChart: React.FC<ClaimChartProps> = ({ type }) => {
             <ResponsiveContainer width="100%" height={300}>
                 <PieChart>
                     <Pie
-                        data={pieData}
+                        data={slices}
                         cx="50%"
                         cy="50%"
                         labelLine={false}
@@ -59,7 +83,7 @@ export const ClaimChart: React.FC<ClaimChartProps> = ({ type }) => {
                         fill="#8884d8"
                         dataKey="value"
                     >
-                        {pieData.map((entry, index) => (
+                        {slices.map((entry, index) => (
                             <Cell key={`cell-${index}`} fill={entry.color} />
                         ))}
                     </Pie>
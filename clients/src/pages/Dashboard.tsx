@@ -10,29 +10,33 @@ import { SkeletonCard } from '@/components/ui/Loading';
 import { mockNotifications } from '@/data/mockData';
 import { formatDate, getStatusLabel } from '@/utils/formatters';
 import { claimService } from '@/services/claimService';
-import type { DashboardStats } from '@/types';
+import type { ClaimStats, DashboardStats } from '@/types';
 
 export const Dashboard: React.FC = () => {
     const [stats, setStats] = useState<DashboardStats | null>(null);
+    const [claimStats, setClaimStats] = useState<ClaimStats | null>(null);
     const [recentClaims, setRecentClaims] = useState<any[]>([]);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
         const loadData = async () => {
             try {
-                // Fetch claims from backend
-                const claimsData = await claimService.getClaims();
+                // Aggregates come from the backend; only the recent claims are listed
+                const [claimStats, claimsData] = await Promise.all([
+                    claimService.getStats(),
+                    claimService.getClaims({ limit: 5 }),
+                ]);
 
-                // Calculate stats from claims
                 const calculatedStats: DashboardStats = {
-                    totalClaims: claimsData.length,
-                    approvedClaims: claimsData.filter(c => c.status === 'approved').length,
-                    pendingClaims: claimsData.filter(c => c.status === 'pending').length,
-                    rejectedClaims: claimsData.filter(c => c.status === 'rejected').length,
+                    totalClaims: claimStats.claims,
+                    approvedClaims: claimStats.by_status.approved,
+                    pendingClaims: claimStats.by_status.pending,
+                    rejectedClaims: claimStats.by_status.rejected,
                     averageProcessingTime: 0, // Calculate if needed
                 };
 
                 setStats(calculatedStats);
+                setClaimStats(claimStats);
                 setRecentClaims(claimsData.slice(0, 5));
                 setLoading(false);
             } catch (error) {
@@ -104,8 +108,8 @@ export const Dashboard: React.FC = () => {
 
             {/* Charts */}
             <div className="grid grid-cols-1 lg:grid-cols-2 gap-6 mb-8">
-                <ClaimChart type="line" />
-                <ClaimChart type="pie" />
+                <ClaimChart type="line" stats={claimStats} />
+                <ClaimChart type="pie" stats={claimStats} />
             </div>
 
             {/* Recent Claims */}
@@ -1,5 +1,5 @@
 import apiClient, { getAuthHeaders } from './api';
-import type { Claim, ClaimStatus } from '../types';
+import type { Claim, ClaimStats, ClaimStatus } from '../types';
 
 export interface CreateClaimData {
     claimant_name: string;
@@ -86,6 +86,14 @@ export const claimService = {
         return response.data;
     },
 
+    /**
+     * Get dashboard statistics, with a daily series for the last `days` days
+     */
+    async getStats(days = 30): Promise<ClaimStats> {
+        const response = await apiClient.get<ClaimStats>(`/claims/stats?days=${days}`);
+        return response.data;
+    },
+
     /**
      * Get a single claim by ID
      */
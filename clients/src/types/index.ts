@@ -83,3 +83,18 @@ export interface DashboardStats {
     rejectedClaims: number;
     averageProcessingTime: number;
 }
+
+export interface ClaimStatsBucket {
+    claims: number;
+    by_status: Record<ClaimStatus, number>;
+    by_fraud_risk: Record<'low' | 'medium' | 'high', number>;
+    estimated_cost: number;
+}
+
+export interface ClaimStatsDay extends ClaimStatsBucket {
+    day: string;
+}
+
+export interface ClaimStats extends ClaimStatsBucket {
+    daily: ClaimStatsDay[];
+}